@@ -1,5 +1,8 @@
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
 
 
@@ -10,12 +13,8 @@ def create_directories():
         Path(directory).mkdir(parents=True, exist_ok=True)
         print(f"✅ Directorio: {directory}")
 
-def create_svg_images():
-    """Crear imágenes SVG simples y atractivas"""
-    images_dir = Path("static/images/products")
-    
-    # Template SVG mejorado con gradientes
-    svg_template = '''<svg width="600" height="600" xmlns="http://www.w3.org/2000/svg">
+# Template SVG mejorado con gradientes
+SVG_TEMPLATE = '''<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
     <defs>
         <linearGradient id="grad{id}" x1="0%" y1="0%" x2="100%" y2="100%">
             <stop offset="0%" style="stop-color:{color1};stop-opacity:1" />
@@ -45,54 +44,132 @@ def create_svg_images():
     <rect x="280" y="490" width="40" height="70" rx="5" fill="rgba(255,255,255,0.1)"/>
     <circle cx="300" cy="570" r="8" fill="rgba(255,255,255,0.4)"/>
 </svg>'''
+
+IMAGE_SIZE = 600
+IMAGES_DIR = Path("static/images/products")
+MANIFEST_FILE = IMAGES_DIR / "manifest.json"
+
+# Configuración de imágenes con gradientes atractivos
+IMAGES = [
+    # Galaxy A55 - Producto principal
+    ("Samsung Galaxy A55", "5G Dual SIM 128GB", "#667eea", "#764ba2", "galaxy_a55_1.svg", 1),
+    ("Galaxy A55", "Vista Trasera", "#764ba2", "#667eea", "galaxy_a55_2.svg", 2),
+    ("Galaxy A55", "Vista Lateral", "#f093fb", "#f5576c", "galaxy_a55_3.svg", 3),
+    ("Galaxy A55", "Características", "#4facfe", "#00f2fe", "galaxy_a55_4.svg", 4),
     
-    # Configuración de imágenes con gradientes atractivos
-    images = [
-        # Galaxy A55 - Producto principal
-        ("Samsung Galaxy A55", "5G Dual SIM 128GB", "#667eea", "#764ba2", "galaxy_a55_1.svg", 1),
-        ("Galaxy A55", "Vista Trasera", "#764ba2", "#667eea", "galaxy_a55_2.svg", 2),
-        ("Galaxy A55", "Vista Lateral", "#f093fb", "#f5576c", "galaxy_a55_3.svg", 3),
-        ("Galaxy A55", "Características", "#4facfe", "#00f2fe", "galaxy_a55_4.svg", 4),
-        
-        # Productos relacionados
-        ("Samsung Galaxy A54", "5G 128GB", "#5f27cd", "#a29bfe", "galaxy_a54_1.svg", 5),
-        ("Galaxy A54", "Cámara Triple", "#a29bfe", "#6c5ce7", "galaxy_a54_2.svg", 6),
-        
-        ("Samsung Galaxy A35", "5G Dual SIM", "#00d2d3", "#00cec9", "galaxy_a35_1.svg", 7),
-        ("Galaxy A35", "Pantalla AMOLED", "#00cec9", "#55a3ff", "galaxy_a35_2.svg", 8),
-        
-        ("Samsung Galaxy A25", "5G Negro", "#ff7675", "#fd79a8", "galaxy_a25_1.svg", 9),
-        ("Galaxy A25", "Alto Rendimiento", "#fd79a8", "#fdcb6e", "galaxy_a25_2.svg", 10),
-        
-        ("Samsung Galaxy A15", "5G Azul", "#74b9ff", "#0984e3", "galaxy_a15_1.svg", 11),
-        ("Galaxy A15", "Batería Duradera", "#0984e3", "#74b9ff", "galaxy_a15_2.svg", 12),
-        
-        # Imagen por defecto
-        ("Imagen No Disponible", "Producto", "#ddd", "#bbb", "default.svg", 13),
-    ]
-    
-    print(f"🎨 Creando {len(images)} imágenes SVG...")
-    
-    success_count = 0
-    for title, subtitle, color1, color2, filename, img_id in images:
-        try:
-            svg_content = svg_template.format(
-                title=title, 
-                subtitle=subtitle, 
-                color1=color1, 
-                color2=color2,
-                id=img_id
-            )
-            file_path = images_dir / filename
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(svg_content)
-            print(f"✅ Creado: {filename}")
-            success_count += 1
-        except Exception as e:
-            print(f"❌ Error creando {filename}: {e}")
-    
-    print(f"\n🎉 Imágenes creadas: {success_count}/{len(images)}")
-    return success_count > 0
+    # Productos relacionados
+    ("Samsung Galaxy A54", "5G 128GB", "#5f27cd", "#a29bfe", "galaxy_a54_1.svg", 5),
+    ("Galaxy A54", "Cámara Triple", "#a29bfe", "#6c5ce7", "galaxy_a54_2.svg", 6),
+    
+    ("Samsung Galaxy A35", "5G Dual SIM", "#00d2d3", "#00cec9", "galaxy_a35_1.svg", 7),
+    ("Galaxy A35", "Pantalla AMOLED", "#00cec9", "#55a3ff", "galaxy_a35_2.svg", 8),
+    
+    ("Samsung Galaxy A25", "5G Negro", "#ff7675", "#fd79a8", "galaxy_a25_1.svg", 9),
+    ("Galaxy A25", "Alto Rendimiento", "#fd79a8", "#fdcb6e", "galaxy_a25_2.svg", 10),
+    
+    ("Samsung Galaxy A15", "5G Azul", "#74b9ff", "#0984e3", "galaxy_a15_1.svg", 11),
+    ("Galaxy A15", "Batería Duradera", "#0984e3", "#74b9ff", "galaxy_a15_2.svg", 12),
+    
+    # Imagen por defecto
+    ("Imagen No Disponible", "Producto", "#ddd", "#bbb", "default.svg", 13),
+]
+
+def load_manifest(manifest_file: Path = MANIFEST_FILE) -> dict:
+    """Cargar el manifest de assets existente (vacío si no existe)"""
+    if not manifest_file.exists():
+        return {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get("assets", {})
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def render_svg_image(spec, images_dir: str, previous_hash: str = None) -> dict:
+    """
+    Renderizar una imagen SVG (se ejecuta en un proceso del pool).
+    
+    Si el hash del contenido coincide con el del manifest y el archivo existe,
+    no se reescribe.
+    """
+    title, subtitle, color1, color2, filename, img_id = spec
+    svg_content = SVG_TEMPLATE.format(
+        title=title, 
+        subtitle=subtitle, 
+        color1=color1, 
+        color2=color2,
+        id=img_id,
+        width=IMAGE_SIZE,
+        height=IMAGE_SIZE
+    )
+    data = svg_content.encode('utf-8')
+    content_hash = hashlib.sha256(data).hexdigest()
+    file_path = Path(images_dir) / filename
+    
+    status = "unchanged"
+    if content_hash != previous_hash or not file_path.exists():
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        status = "created"
+    
+    return {
+        "filename": filename,
+        "status": status,
+        "hash": content_hash,
+        "size": len(data),
+        "width": IMAGE_SIZE,
+        "height": IMAGE_SIZE,
+        "content_type": "image/svg+xml"
+    }
+
+def write_manifest(entries: list, manifest_file: Path = MANIFEST_FILE) -> bool:
+    """Escribir el manifest de assets (filename → hash, tamaño, dimensiones)"""
+    assets = {
+        entry["filename"]: {key: value for key, value in entry.items() if key not in ("filename", "status")}
+        for entry in sorted(entries, key=lambda e: e["filename"])
+    }
+    if assets == load_manifest(manifest_file):
+        return False
+    
+    manifest = {
+        "base_path": "images/products",
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "assets": assets
+    }
+    tmp_file = manifest_file.with_suffix(".json.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, manifest_file)
+    return True
+
+def create_svg_images(max_workers: int = None):
+    """Crear imágenes SVG en paralelo con un pool de procesos"""
+    previous = load_manifest()
+    
+    print(f"🎨 Creando {len(IMAGES)} imágenes SVG...")
+    
+    entries = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                render_svg_image, spec, str(IMAGES_DIR), previous.get(spec[4], {}).get("hash")
+            ): spec[4]
+            for spec in IMAGES
+        }
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                entry = future.result()
+                entries.append(entry)
+                icon = "✅ Creado" if entry["status"] == "created" else "⏭️  Sin cambios"
+                print(f"{icon}: {filename}")
+            except Exception as e:
+                print(f"❌ Error creando {filename}: {e}")
+    
+    created = sum(1 for entry in entries if entry["status"] == "created")
+    print(f"\n🎉 Imágenes creadas: {created}, sin cambios: {len(entries) - created} ({len(entries)}/{len(IMAGES)})")
+    if write_manifest(entries):
+        print(f"🧾 Manifest actualizado: {MANIFEST_FILE}")
+    return len(entries) > 0
 
 def update_products_json():
     """Actualizar products.json con URLs de imágenes SVG"""
@@ -118,12 +195,17 @@ def update_products_json():
         }
         
         # Actualizar imágenes para productos relacionados también
+        changed = False
         for product in data.get("products", []):
             product_id = product["id"]
-            if product_id in image_mapping:
-                product["images"] = [f"{base_url}/{img}" for img in image_mapping[product_id]]
-            else:
-                product["images"] = [f"{base_url}/default.svg"]
+            images = [f"{base_url}/{img}" for img in image_mapping.get(product_id, ["default.svg"])]
+            if product.get("images") != images:
+                product["images"] = images
+                changed = True
+        
+        if not changed:
+            print("⏭️  products.json ya tiene las URLs correctas")
+            return True
         
         # Guardar archivo actualizado
         with open(products_file, 'w', encoding='utf-8') as f:
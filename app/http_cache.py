@@ -0,0 +1,85 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+# Políticas de cache HTTP por tipo de ruta. El navegador siempre revalida
+# (max-age=0); la CDN/proxy usa s-maxage y sirve vencido mientras revalida.
+DETAIL_S_MAXAGE = int(os.getenv("CDN_DETAIL_MAX_AGE", 30))
+LISTING_S_MAXAGE = int(os.getenv("CDN_LISTING_MAX_AGE", 60))
+STALE_WHILE_REVALIDATE = int(os.getenv("CDN_STALE_WHILE_REVALIDATE", 120))
+
+DETAIL_CACHE_CONTROL = (
+    f"public, max-age=0, s-maxage={DETAIL_S_MAXAGE}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+)
+LISTING_CACHE_CONTROL = (
+    f"public, max-age=0, s-maxage={LISTING_S_MAXAGE}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+)
+
+# Clave de todos los listados: crear o borrar productos cambia cualquier página
+LISTING_KEY = "products"
+
+# El sitio puede elegirse por header, así que la CDN debe separar por él
+SITE_HEADER = "X-Site-Id"
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Timestamp ISO 8601 del catálogo (p. ej. 2024-01-20T15:45:00Z)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """True si la copia del cliente sigue vigente (resolución de segundos, como HTTP)"""
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def surrogate_keys(
+    product_ids: Iterable[str] = (),
+    category_ids: Iterable[str] = (),
+    seller_ids: Iterable[str] = (),
+    listing: bool = False,
+    site: Optional[str] = None
+) -> str:
+    """
+    Header Surrogate-Key con los objetos que aparecen en la respuesta, para
+    que una purga por producto, categoría o vendedor alcance exactamente las
+    páginas afectadas. Fuera del sitio por defecto las claves llevan el
+    sitio como prefijo (`MLB:product:...`).
+    """
+    keys = [LISTING_KEY] if listing else []
+    keys += [f"product:{pid}" for pid in product_ids]
+    keys += [f"category:{cid}" for cid in category_ids]
+    keys += [f"seller:{sid}" for sid in seller_ids]
+    if site:
+        keys = [f"{site}:{key}" for key in keys]
+    return " ".join(dict.fromkeys(keys))
+
+
+def cache_headers(
+    cache_control: str,
+    keys: str,
+    last_modified: Optional[datetime] = None,
+    vary: Iterable[str] = ()
+) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control, "Surrogate-Key": keys, "Vary": ", ".join([*vary, SITE_HEADER])}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
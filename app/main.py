@@ -1,21 +1,48 @@
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.middleware.error_handler import ErrorHandler, logging_middleware
-from app.routers import products
+from app.middleware.profiling import profiling_enabled, profiling_middleware
+from app.middleware.rate_limit import (admission_controller,
+                                       admission_middleware,
+                                       rate_limit_enabled,
+                                       rate_limit_middleware, traffic_stats)
+from app.middleware.site import site_middleware
+from app.middleware.tracing import tracing_middleware
+from app.responses import FastJSONResponse
+from app.routers import debug, products
+from app.services.coalescer import request_coalescer
+from app.services.health_service import health_monitor
+from app.services.product_service import product_service
+from app.services.site_registry import site_registry
+from app.services.task_executor import (ClientDisconnected, ExecutorBusy,
+                                        task_executor)
+from app.services.tracing import tracing_stats
 
 # Cargar variables de entorno
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Precarga el catálogo e inicia los chequeos de salud en segundo plano"""
+    await product_service.warm_up()
+    health_monitor.start()
+    yield
+    await health_monitor.stop()
+    task_executor.shutdown()
+
 # Crear aplicación FastAPI con documentación mejorada
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     title="MercadoLibre API",
     description="""
     ## API REST para sistema de productos estilo MercadoLibre
@@ -57,15 +84,36 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
 
+# Agregar middleware de profiling (solo si está configurado, sin costo en otro caso)
+if profiling_enabled():
+    app.middleware("http")(profiling_middleware)
+
+# Control de admisión (requests en vuelo por worker) y rate limiting por
+# cliente; el rate limit corre antes para no ocupar lugar en la cola
+if admission_controller.enabled:
+    app.middleware("http")(admission_middleware)
+if rate_limit_enabled():
+    app.middleware("http")(rate_limit_middleware)
+
+# Catálogo por sitio: /api/sites/{site_id}/... se reescribe antes de los
+# límites de tráfico, que así ven la ruta real
+app.middleware("http")(site_middleware)
+
+# Trazas por request (Server-Timing); dentro del logging para ver su request ID
+app.middleware("http")(tracing_middleware)
+
 # Agregar middleware de logging
 app.middleware("http")(logging_middleware)
 
 # Configurar manejadores de errores
+app.add_exception_handler(StarletteHTTPException, ErrorHandler.http_exception_handler)
 app.add_exception_handler(RequestValidationError, ErrorHandler.validation_exception_handler)
+app.add_exception_handler(ExecutorBusy, ErrorHandler.executor_busy_handler)
+app.add_exception_handler(ClientDisconnected, ErrorHandler.client_disconnected_handler)
 app.add_exception_handler(Exception, ErrorHandler.general_exception_handler)
 
 # Montar archivos estáticos
@@ -75,6 +123,7 @@ if static_dir.exists():
 
 # Incluir routers
 app.include_router(products.router)
+app.include_router(debug.router)
 
 @app.get("/", tags=["Health"])
 async def root():
@@ -97,6 +146,41 @@ async def root():
         ]
     }
 
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    """
+    Liveness probe: responde en tiempo constante sin tocar dependencias
+    
+    Returns:
+        dict: Estado del proceso
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    """
+    Readiness probe: estado del catálogo e índices desde el cache de chequeos
+    
+    Returns:
+        dict: Estado de preparación del servicio (503 si no está listo)
+    """
+    checks = await health_monitor.snapshot()
+    ready = checks["catalog"]["loaded"]
+    
+    return FastJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "checks": checks,
+            "traffic": traffic_stats(),
+            "coalescing": request_coalescer.stats(),
+            "sites": site_registry.stats(),
+            "executor": task_executor.stats(),
+            "tracing": tracing_stats(),
+            "version": "1.0.0"
+        }
+    )
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     """
@@ -106,16 +190,15 @@ async def health_check():
         dict: Estado de salud del servicio
     """
     try:
-        images_dir = Path("static/images/products")
-        images_count = len(list(images_dir.glob("*.svg"))) if images_dir.exists() else 0
+        checks = await health_monitor.snapshot()
         
         return {
             "status": "healthy",
             "message": "API funcionando correctamente",
             "checks": {
-                "static_directory": static_dir.exists(),
-                "images_available": images_count,
-                "database": "mock_data_ok"
+                "static_directory": checks["static_directory"],
+                "images_available": checks["images_available"],
+                "database": "mock_data_ok" if checks["catalog"]["loaded"] else "not_loaded"
             },
             "version": "1.0.0"
         }
@@ -127,6 +210,8 @@ async def health_check():
         }
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "app.main:app",
         host=os.getenv("HOST", "127.0.0.1"),
@@ -3,9 +3,10 @@ import traceback
 import uuid
 from datetime import datetime
 
-from fastapi import HTTPException, Request
+from fastapi import HTTPException, Request, Response
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+
+from app.responses import FastJSONResponse
 
 # Configurar logging
 logging.basicConfig(
@@ -29,8 +30,9 @@ class ErrorHandler:
         
         logger.error(f"HTTP Exception [{error_id}]: {exc.status_code} - {exc.detail}")
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=exc.status_code,
+            headers=getattr(exc, "headers", None),
             content={
                 "error": {
                     "id": error_id,
@@ -50,7 +52,7 @@ class ErrorHandler:
         
         logger.error(f"Validation Error [{error_id}]: {exc.errors()}")
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=422,
             content={
                 "error": {
@@ -65,6 +67,34 @@ class ErrorHandler:
             }
         )
     
+    @staticmethod
+    async def executor_busy_handler(request: Request, exc: Exception):
+        """Manejar pools de trabajo llenos (503 para reintentar)"""
+        error_id = str(uuid.uuid4())
+        
+        logger.warning(f"Executor Busy [{error_id}]: {str(exc)}")
+        
+        return FastJSONResponse(
+            status_code=503,
+            headers={"Retry-After": "1"},
+            content={
+                "error": {
+                    "id": error_id,
+                    "type": "overloaded",
+                    "status_code": 503,
+                    "message": "Servicio sobrecargado, intente nuevamente más tarde",
+                    "timestamp": datetime.now().isoformat(),
+                    "path": str(request.url.path)
+                }
+            }
+        )
+    
+    @staticmethod
+    async def client_disconnected_handler(request: Request, exc: Exception):
+        """Manejar clientes desconectados (nadie lee la respuesta)"""
+        logger.info(f"Cliente desconectado: {request.method} {request.url.path}")
+        return Response(status_code=499)
+    
     @staticmethod
     async def general_exception_handler(request: Request, exc: Exception):
         """Manejar excepciones generales"""
@@ -73,7 +103,7 @@ class ErrorHandler:
         logger.error(f"Unhandled Exception [{error_id}]: {str(exc)}")
         logger.error(f"Traceback [{error_id}]: {traceback.format_exc()}")
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "error": {
@@ -92,6 +122,8 @@ async def logging_middleware(request: Request, call_next):
     """Middleware para logging de requests"""
     start_time = datetime.now()
     request_id = str(uuid.uuid4())
+    # Disponible para las trazas, que lo guardan en el span raíz
+    request.state.request_id = request_id
     
     # Log del request
     logger.info(f"Request [{request_id}]: {request.method} {request.url}")
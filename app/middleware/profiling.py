@@ -0,0 +1,161 @@
+import hmac
+import logging
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+# Configuración (variables de entorno)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL_MS", 1)) / 1000
+
+PROFILE_FORMATS = ("collapsed", "pstats")
+
+
+def profiling_enabled() -> bool:
+    """El middleware solo se registra si hay token o muestreo configurado"""
+    return bool(PROFILING_TOKEN) or PROFILING_SAMPLE_RATE > 0
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+class StackSampler:
+    """
+    Profiler estadístico: un hilo toma el stack del hilo del event loop cada
+    `interval` segundos y acumula stacks en formato collapsed (flamegraph.pl,
+    speedscope). Como el loop es compartido, puede incluir trabajo de otros
+    requests concurrentes.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ":")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(self._label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Detiene el muestreo y devuelve el profile en formato collapsed"""
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """Últimos profiles capturados, acotados en cantidad"""
+
+    def __init__(self, max_profiles: int = 20):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def add(self, profile: Dict) -> str:
+        profile_id = str(uuid.uuid4())
+        self._profiles[profile_id] = profile
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        return [
+            {"id": profile_id, **{k: v for k, v in profile.items() if k != "data"}}
+            for profile_id, profile in reversed(self._profiles.items())
+        ]
+
+
+profile_store = ProfileStore()
+
+# cProfile no admite dos perfiles activos a la vez en el mismo intérprete
+_cprofile_lock = threading.Lock()
+
+
+def _requested_format(request: Request) -> Optional[str]:
+    """Formato pedido por el cliente (header con token) o por muestreo"""
+    fmt = request.headers.get("X-Profile")
+    if fmt is not None:
+        if fmt in PROFILE_FORMATS and is_authorized(request.headers.get("X-Profile-Token")):
+            return fmt
+        return None
+
+    if PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE:
+        return "collapsed"
+    return None
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Middleware para capturar profiles de requests individuales bajo demanda"""
+    fmt = _requested_format(request)
+    if fmt is None:
+        return await call_next(request)
+
+    start_time = time.perf_counter()
+
+    if fmt == "pstats":
+        if not _cprofile_lock.acquire(blocking=False):
+            response = await call_next(request)
+            response.headers["X-Profile-Status"] = "busy"
+            return response
+        import cProfile  # solo se carga si alguien pide pstats
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+            _cprofile_lock.release()
+        profiler.create_stats()
+        data = marshal.dumps(profiler.stats)
+    else:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            data = sampler.stop()
+
+    profile_id = profile_store.add({
+        "format": fmt,
+        "method": request.method,
+        "path": request.url.path,
+        "status_code": response.status_code,
+        "duration": time.perf_counter() - start_time,
+        "data": data
+    })
+    logger.info(f"Profile [{profile_id}]: {request.method} {request.url.path} ({fmt})")
+
+    response.headers["X-Profile-ID"] = profile_id
+    return response
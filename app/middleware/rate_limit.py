@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+
+from app.responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Configuración (variables de entorno)
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 64))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 128))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2.0))
+
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", 0))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", RATE_LIMIT_RPS * 2))
+RATE_LIMIT_SEARCH_RPS = float(os.getenv("RATE_LIMIT_SEARCH_RPS", RATE_LIMIT_RPS))
+RATE_LIMIT_SEARCH_BURST = float(os.getenv("RATE_LIMIT_SEARCH_BURST", RATE_LIMIT_SEARCH_RPS * 2))
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "False").lower() == "true"
+
+# Rutas que nunca se limitan (probes del orquestador, documentación)
+EXEMPT_PREFIXES = ("/health", "/docs", "/redoc", "/openapi.json")
+
+
+def _error_response(request: Request, status_code: int, error_type: str, message: str, retry_after: float):
+    """Respuesta con el mismo formato que ErrorHandler y header Retry-After"""
+    return FastJSONResponse(
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        content={
+            "error": {
+                "id": str(uuid.uuid4()),
+                "type": error_type,
+                "status_code": status_code,
+                "message": message,
+                "timestamp": datetime.now().isoformat(),
+                "path": str(request.url.path)
+            }
+        }
+    )
+
+
+def _is_exempt(path: str) -> bool:
+    return path == "/" or path.startswith(EXEMPT_PREFIXES)
+
+
+class AdmissionController:
+    """
+    Limita los requests en vuelo por worker.
+
+    Los que exceden `max_in_flight` esperan en una cola acotada como mucho
+    `queue_timeout` segundos; con la cola llena se rechazan de inmediato, así
+    la latencia de los admitidos no se degrada bajo picos.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    async def acquire(self) -> bool:
+        """Intenta admitir un request; False si hay que descartarlo"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class RateLimiter:
+    """
+    Token bucket por cliente: `rate` tokens por segundo hasta `burst`.
+
+    Guarda un bucket por cliente activo. Un bucket sin uso durante
+    `burst / rate` segundos ya estaría lleno, así que se puede descartar sin
+    cambiar el resultado; eso se hace en barridos cada `sweep_interval`.
+    """
+
+    def __init__(self, rate: float, burst: float, sweep_interval: float = 60.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.sweep_interval = sweep_interval
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._last_sweep = 0.0
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, client: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Consume un token; devuelve (permitido, segundos hasta el próximo token)"""
+        now = time.monotonic() if now is None else now
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.burst, now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate)
+            bucket.updated_at = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True, 0.0
+
+        self.limited += 1
+        return False, (1 - bucket.tokens) / self.rate
+
+    def sweep(self, now: Optional[float] = None):
+        """Descarta los buckets de clientes inactivos (ya llenos)"""
+        now = time.monotonic() if now is None else now
+        full_after = self.burst / self.rate
+        idle = [client for client, bucket in self._buckets.items() if now - bucket.updated_at >= full_after]
+        for client in idle:
+            del self._buckets[client]
+        self._last_sweep = now
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "limited": self.limited,
+        }
+
+
+admission_controller = AdmissionController()
+
+# Presupuestos por tipo de ruta: la búsqueda es más cara que el detalle
+rate_limiters: Dict[str, RateLimiter] = {
+    "default": RateLimiter(RATE_LIMIT_RPS, RATE_LIMIT_BURST),
+    "search": RateLimiter(RATE_LIMIT_SEARCH_RPS, RATE_LIMIT_SEARCH_BURST),
+}
+
+
+def rate_limit_enabled() -> bool:
+    return any(limiter.enabled for limiter in rate_limiters.values())
+
+
+def traffic_stats() -> Dict[str, Dict]:
+    """Métricas de admisión y rate limiting del worker"""
+    return {
+        "admission": admission_controller.stats(),
+        "rate_limits": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+    }
+
+
+def _policy_for(request: Request) -> str:
+    path = request.url.path
+    if path.startswith("/api/products/search/"):
+        return "search"
+    if path.rstrip("/") == "/api/products" and request.query_params.get("search"):
+        return "search"
+    return "default"
+
+
+def _client_key(request: Request) -> str:
+    """API key si viene en el request; si no, la IP del cliente"""
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return f"key:{api_key}"
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    """Middleware de rate limiting por cliente (429 + Retry-After)"""
+    if _is_exempt(request.url.path):
+        return await call_next(request)
+
+    limiter = rate_limiters[_policy_for(request)]
+    if limiter.enabled:
+        client = _client_key(request)
+        allowed, retry_after = limiter.allow(client)
+        if not allowed:
+            logger.warning(f"Rate limit: {client} {request.method} {request.url.path}")
+            return _error_response(
+                request, 429, "rate_limited",
+                "Demasiados requests, intente nuevamente más tarde", retry_after
+            )
+
+    return await call_next(request)
+
+
+async def admission_middleware(request: Request, call_next):
+    """Middleware de control de admisión (503 + Retry-After bajo sobrecarga)"""
+    controller = admission_controller
+    if not controller.enabled or _is_exempt(request.url.path):
+        return await call_next(request)
+
+    if not await controller.acquire():
+        logger.warning(f"Request descartado por sobrecarga: {request.method} {request.url.path}")
+        return _error_response(
+            request, 503, "overloaded",
+            "Servicio sobrecargado, intente nuevamente más tarde", controller.queue_timeout
+        )
+
+    try:
+        return await call_next(request)
+    finally:
+        controller.release()
@@ -0,0 +1,17 @@
+import re
+
+from fastapi import Request
+
+# /api/sites/{site_id}/products/... se atiende como /api/products/... del sitio
+SITE_PREFIX = re.compile(r"^/api/sites/(?P<site>[A-Za-z0-9_-]{1,16})(?P<rest>/.*)$")
+
+
+async def site_middleware(request: Request, call_next):
+    """Quita el prefijo de sitio de la ruta y deja el sitio en request.state"""
+    match = SITE_PREFIX.match(request.url.path)
+    if match:
+        path = "/api" + match.group("rest")
+        request.scope["path"] = path
+        request.scope["raw_path"] = path.encode()
+        request.state.site_id = match.group("site")
+    return await call_next(request)
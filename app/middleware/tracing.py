@@ -0,0 +1,25 @@
+from fastapi import Request
+
+from app.services.tracing import TRACING_ENABLED, export, start_trace
+
+
+async def tracing_middleware(request: Request, call_next):
+    """Span raíz por request, header Server-Timing y exportación de la traza"""
+    if not TRACING_ENABLED:
+        return await call_next(request)
+
+    attributes = {
+        "http.method": request.method,
+        "http.target": request.url.path,
+        "request.id": getattr(request.state, "request_id", ""),
+    }
+    try:
+        with start_trace(f"{request.method} {request.url.path}", request.headers.get("traceparent"),
+                         **attributes) as root:
+            response = await call_next(request)
+            root.set("http.status_code", response.status_code)
+    finally:
+        export(root.trace)
+
+    response.headers["Server-Timing"] = root.trace.server_timing(root)
+    return response
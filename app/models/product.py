@@ -22,11 +22,22 @@ class Seller(BaseModel):
     name: str
     reputation: str
     sales: str
+    sales_count: Optional[int] = None
     location: str
     rating: float
     years_selling: int
     verified: bool
 
+class SellerSummary(BaseModel):
+    id: str
+    name: str
+    reputation: str
+    verified: bool
+
+class CategorySummary(BaseModel):
+    id: str
+    name: str
+
 class ProductBase(BaseModel):
     title: str
     price: float
@@ -36,17 +47,18 @@ class ProductBase(BaseModel):
     seller_id: str
 
 class ProductCreate(ProductBase):
+    price: float = Field(..., gt=0)
     images: List[str] = []
     colors: List[ProductColor] = []
     specifications: List[ProductSpecification] = []
     description: str = ""
     features: List[str] = []
-    stock: int = 0
+    stock: int = Field(0, ge=0)
 
 class ProductUpdate(BaseModel):
     title: Optional[str] = None
-    price: Optional[float] = None
-    stock: Optional[int] = None
+    price: Optional[float] = Field(None, gt=0)
+    stock: Optional[int] = Field(None, ge=0)
     description: Optional[str] = None
 
 class Product(ProductBase):
@@ -68,6 +80,7 @@ class Product(ProductBase):
     features: List[str] = []
     created_at: datetime
     updated_at: datetime
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -86,6 +99,8 @@ class ProductSummary(BaseModel):
     reviews_count: int
     free_shipping: bool
     condition: str
+    seller: Optional[SellerSummary] = None
+    category: Optional[CategorySummary] = None
 
 class ProductListResponse(BaseModel):
     products: List[ProductSummary]
@@ -93,6 +108,27 @@ class ProductListResponse(BaseModel):
     page: int
     size: int
     pages: int
+    did_you_mean: Optional[str] = None
+
+class StockUpdateItem(BaseModel):
+    id: str
+    stock: Optional[int] = Field(None, ge=0)
+    price: Optional[float] = Field(None, gt=0)
+    version: Optional[int] = None
+
+class StockBulkUpdate(BaseModel):
+    items: List[StockUpdateItem] = Field(..., max_length=10000)
+
+class StockUpdateResult(BaseModel):
+    id: str
+    status: str
+    version: Optional[int] = None
+    message: Optional[str] = None
+
+class StockBulkUpdateResponse(BaseModel):
+    results: List[StockUpdateResult]
+    updated: int
+    failed: int
 
 # Para resolver la referencia circular
 ProductResponse.model_rebuild()
\ No newline at end of file
@@ -0,0 +1,32 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada por pydantic-core (Rust).
+
+    Los modelos se serializan con `model_dump_json` y el resto (listas de
+    modelos, dicts con datetimes, etc.) con `pydantic_core.to_json`, sin pasar
+    por `jsonable_encoder` + `json.dumps`. Los handlers que devuelven esta
+    respuesta directamente también evitan la revalidación del response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+def render_json(content: Any) -> bytes:
+    """Serializa como FastJSONResponse, para reutilizar el cuerpo ya generado"""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode("utf-8")
+    return to_json(content, inf_nan_mode="null", serialize_unknown=True)
+
+
+class RenderedJSONResponse(Response):
+    """Respuesta JSON con el cuerpo ya serializado (p. ej. compartido entre requests)"""
+
+    media_type = "application/json"
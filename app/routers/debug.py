@@ -0,0 +1,52 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Path
+from fastapi.responses import PlainTextResponse, Response
+
+from app.middleware.profiling import is_authorized, profile_store
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+    include_in_schema=False,
+)
+
+
+def _check_token(token: Optional[str]):
+    # 404 en lugar de 401/403 para no revelar el endpoint
+    if not is_authorized(token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """
+    Lista los últimos profiles capturados.
+    """
+    _check_token(x_profile_token)
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str = Path(..., description="ID devuelto en el header X-Profile-ID"),
+    x_profile_token: Optional[str] = Header(None)
+):
+    """
+    Descarga un profile: texto collapsed para flame graphs o archivo .prof
+    (pstats/snakeviz).
+    """
+    _check_token(x_profile_token)
+
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' no encontrado")
+
+    if profile["format"] == "pstats":
+        return Response(
+            content=profile["data"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+        )
+
+    return PlainTextResponse(profile["data"])
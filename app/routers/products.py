@@ -1,11 +1,29 @@
 import asyncio
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi import (APIRouter, Depends, Header, HTTPException, Path, Query,
+                     Request, Response)
 
-from app.models.product import (ProductListResponse, ProductResponse,
-                                ProductSummary)
-from app.services.product_service import product_service
+from app.http_cache import (DETAIL_CACHE_CONTROL, LISTING_CACHE_CONTROL,
+                            SITE_HEADER, cache_headers, is_not_modified,
+                            parse_timestamp, surrogate_keys)
+from app.models.product import (ProductCreate, ProductListResponse,
+                                ProductResponse, ProductSummary,
+                                ProductUpdate, StockBulkUpdate,
+                                StockBulkUpdateResponse)
+from app.responses import (FastJSONResponse, RenderedJSONResponse,
+                           render_json)
+from app.services.coalescer import request_coalescer
+from app.services.columnar_index import SORT_OPTIONS
+from app.services.normalization import NORMALIZED_ATTRIBUTES
+from app.services.image_service import image_service
+from app.services.product_service import (RELATED_LIMIT, ProductService,
+                                          product_service)
+from app.services.site_registry import site_registry
+from app.services.task_executor import (ClientDisconnected, ExecutorBusy,
+                                        task_executor)
+from app.services.tracing import span
 
 router = APIRouter(
     prefix="/api/products",
@@ -13,6 +31,62 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def get_service(request: Request, x_site_id: Optional[str] = Header(None)) -> ProductService:
+    """Catálogo del sitio pedido (prefijo /api/sites/{site_id} o header X-Site-Id)"""
+    site_id = getattr(request.state, "site_id", None) or x_site_id
+    if site_id is None or site_id == site_registry.default_site:
+        return product_service
+    try:
+        return site_registry.get(site_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sitio '{site_id}' no encontrado")
+
+def _parse_ranges(values: List[str]) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """Convierte `atributo:min:max` (min o max pueden ir vacíos) en rangos"""
+    ranges = {}
+    for value in values:
+        parts = value.split(":")
+        if len(parts) != 3 or parts[0] not in NORMALIZED_ATTRIBUTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Rango inválido '{value}': use atributo:min:max con atributo en {', '.join(NORMALIZED_ATTRIBUTES)}"
+            )
+        try:
+            ranges[parts[0]] = tuple(float(bound) if bound else None for bound in parts[1:])
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Rango inválido '{value}': los límites deben ser numéricos")
+    return ranges
+
+# Partes que puede pedir el endpoint de página de producto
+PAGE_PARTS = ("product", "seller", "related", "images", "breadcrumb")
+
+def _parse_parts(include: Optional[str]) -> List[str]:
+    if not include:
+        return list(PAGE_PARTS)
+    parts = [part.strip() for part in include.split(",") if part.strip()]
+    unknown = [part for part in parts if part not in PAGE_PARTS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Partes desconocidas: {', '.join(unknown)}. Disponibles: {', '.join(PAGE_PARTS)}"
+        )
+    return parts
+
+def _listing_headers(
+    service: ProductService,
+    products: List[ProductSummary],
+    category_ids: Tuple[str, ...] = ()
+) -> Dict[str, str]:
+    """Cache-Control de listados y Surrogate-Key de todo lo que aparece en la página"""
+    keys = surrogate_keys(
+        [p.id for p in products],
+        [*category_ids, *(p.category.id for p in products if p.category)],
+        [p.seller.id for p in products if p.seller],
+        listing=True,
+        site=service.site_id
+    )
+    return cache_headers(LISTING_CACHE_CONTROL, keys)
+
 @router.get("/", response_model=ProductListResponse)
 async def get_products(
     skip: int = Query(0, ge=0, description="Número de productos a omitir"),
@@ -20,63 +94,124 @@ async def get_products(
     category_id: Optional[str] = Query(None, description="Filtrar por categoría"),
     search: Optional[str] = Query(None, description="Búsqueda por texto"),
     min_price: Optional[float] = Query(None, ge=0, description="Precio mínimo"),
-    max_price: Optional[float] = Query(None, ge=0, description="Precio máximo")
+    max_price: Optional[float] = Query(None, ge=0, description="Precio máximo"),
+    free_shipping: Optional[bool] = Query(None, description="Solo con (o sin) envío gratis"),
+    condition: Optional[str] = Query(None, description="Condición (p. ej. Nuevo)"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5, description="Calificación mínima"),
+    range_filters: List[str] = Query(
+        [],
+        alias="range",
+        description="Rango sobre un atributo normalizado, repetible: atributo:min:max (p. ej. ram_gb:8: o screen_in:6:6.7)"
+    ),
+    sort: Optional[str] = Query(
+        None,
+        pattern=f"^({'|'.join(SORT_OPTIONS)})$",
+        description=f"Orden: {', '.join(SORT_OPTIONS)} (por defecto, orden de catálogo)"
+    ),
+    service: ProductService = Depends(get_service)
 ):
     """
     Obtiene una lista paginada de productos con filtros opcionales.
     """
+    ranges = _parse_ranges(range_filters)
+    
     # Simular latencia de red
     await asyncio.sleep(0.1)
     
-    products = await product_service.get_products(
-        skip=skip,
-        limit=limit,
-        category_id=category_id,
-        search=search,
-        min_price=min_price,
-        max_price=max_price
-    )
-    
-    # Calcular total y paginación (simulado)
-    total = len(products) + skip  # Simplificado para el mock
-    pages = (total + limit - 1) // limit
+    async def render() -> Tuple[bytes, Dict[str, str]]:
+        products, total, suggestion = await service.find_products(
+            skip=skip,
+            limit=limit,
+            category_id=category_id,
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            free_shipping=free_shipping,
+            condition=condition,
+            min_rating=min_rating,
+            ranges=ranges,
+            sort=sort
+        )
+        
+        # Total de coincidencias (no solo de la página) y paginación
+        pages = (total + limit - 1) // limit
+        
+        with span("serialize"):
+            body = render_json(ProductListResponse(
+                products=products,
+                total=total,
+                page=(skip // limit) + 1,
+                size=len(products),
+                pages=pages,
+                did_you_mean=suggestion
+            ))
+        return body, _listing_headers(service, products, (category_id,) if category_id else ())
     
-    return ProductListResponse(
-        products=products,
-        total=total,
-        page=(skip // limit) + 1,
-        size=len(products),
-        pages=pages
+    # La búsqueda no distingue mayúsculas, así que la clave tampoco
+    key = (
+        service.site_id, skip, limit, category_id, search.lower() if search else None,
+        min_price, max_price, free_shipping, condition, min_rating,
+        tuple(sorted(ranges.items())), sort
     )
+    body, headers = await request_coalescer.run("list", key, render)
+    return RenderedJSONResponse(body, headers=headers)
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
-    product_id: str = Path(..., description="ID único del producto")
+    product_id: str = Path(..., description="ID único del producto"),
+    if_modified_since: Optional[str] = Header(None),
+    service: ProductService = Depends(get_service)
 ):
     """
     Obtiene los detalles completos de un producto específico,
     incluyendo información del vendedor y productos relacionados.
+    
+    Responde 304 si el producto y sus relacionados no cambiaron desde
+    `If-Modified-Since`.
     """
     # Simular latencia de red
     await asyncio.sleep(0.15)
     
-    product = await product_service.get_product_by_id(product_id)
-    
-    if not product:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Producto con ID '{product_id}' no encontrado"
+    async def render():
+        product = await service.get_product_by_id(product_id)
+        
+        if not product:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Producto con ID '{product_id}' no encontrado"
+            )
+        
+        # La página incluye a los relacionados: cambia si cambia cualquiera
+        product_ids = [product.id] + [p.id for p in product.related_products]
+        timestamps = [parse_timestamp(t) for t in await service.updated_at(product_ids)]
+        last_modified = max((t for t in timestamps if t is not None), default=None)
+        
+        keys = surrogate_keys(
+            product_ids,
+            [product.category_id],
+            [product.seller_id] + [p.seller.id for p in product.related_products if p.seller],
+            site=service.site_id
         )
+        with span("serialize"):
+            body = render_json(product)
+        return body, cache_headers(DETAIL_CACHE_CONTROL, keys, last_modified), last_modified
     
-    return product
+    body, headers, last_modified = await request_coalescer.run("detail", (service.site_id, product_id), render)
+    if is_not_modified(if_modified_since, last_modified):
+        return Response(status_code=304, headers=headers)
+    return RenderedJSONResponse(body, headers=headers)
 
 @router.get("/search/{query}", response_model=List[ProductSummary])
 async def search_products(
     query: str = Path(..., description="Término de búsqueda"),
-    limit: int = Query(10, ge=1, le=50, description="Número máximo de resultados")
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de resultados"),
+    service: ProductService = Depends(get_service)
 ):
     """
     Búsqueda de productos por término de texto.
+    
+    Sin coincidencias exactas tolera errores de tipeo; la búsqueda corregida
+    va en el header `X-Did-You-Mean` (URL-encoded).
     """
     await asyncio.sleep(0.08)
     
@@ -86,26 +221,38 @@ async def search_products(
             detail="El término de búsqueda debe tener al menos 2 caracteres"
         )
     
-    products = await product_service.search_products(query, limit)
-    return products
+    async def render() -> Tuple[bytes, Dict[str, str]]:
+        products, _, suggestion = await service.find_products(limit=limit, search=query)
+        headers = _listing_headers(service, products)
+        if suggestion:
+            headers["X-Did-You-Mean"] = quote(suggestion)
+        with span("serialize"):
+            body = render_json(products)
+        return body, headers
+    
+    key = (service.site_id, query.lower(), limit)
+    body, headers = await request_coalescer.run("search", key, render)
+    return RenderedJSONResponse(body, headers=headers)
 
 @router.get("/category/{category_id}", response_model=List[ProductSummary])
 async def get_products_by_category(
     category_id: str = Path(..., description="ID de la categoría"),
-    limit: int = Query(20, ge=1, le=100, description="Número máximo de productos")
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de productos"),
+    service: ProductService = Depends(get_service)
 ):
     """
     Obtiene productos de una categoría específica.
     """
     await asyncio.sleep(0.1)
     
-    products = await product_service.get_products_by_category(category_id, limit)
-    return products
+    products = await service.get_products_by_category(category_id, limit)
+    return FastJSONResponse(products, headers=_listing_headers(service, products, (category_id,)))
 
 @router.get("/{product_id}/related", response_model=List[ProductSummary])
 async def get_related_products(
     product_id: str = Path(..., description="ID del producto base"),
-    limit: int = Query(4, ge=1, le=10, description="Número máximo de productos relacionados")
+    limit: int = Query(4, ge=1, le=10, description="Número máximo de productos relacionados"),
+    service: ProductService = Depends(get_service)
 ):
     """
     Obtiene productos relacionados a un producto específico.
@@ -113,7 +260,7 @@ async def get_related_products(
     await asyncio.sleep(0.08)
     
     # Primero verificar que el producto existe
-    product = await product_service.get_product_by_id(product_id)
+    product = await service.get_product_by_id(product_id)
     if not product:
         raise HTTPException(
             status_code=404, 
@@ -122,42 +269,224 @@ async def get_related_products(
     
     
     # Retornar productos relacionados
-    return product.related_products[:limit]
+    related = product.related_products[:limit]
+    return FastJSONResponse(related, headers=_listing_headers(service, related, (product.category_id,)))
 
 # Al final del archivo app/routers/products.py, agregar:
 
+async def _image_metadata(product: ProductResponse, fmt: str, request: Optional[Request] = None) -> Dict[str, Any]:
+    """Metadatos y derivados (srcset) de las imágenes de un producto"""
+    images_with_metadata = []
+    for i, image_url in enumerate(product.images):
+        # La generación de derivados (Pillow libera el GIL) se hace fuera del
+        # event loop y se abandona si el cliente se desconecta
+        sizes = await task_executor.run_io(image_service.srcset, image_url, fmt, request=request)
+        asset = image_service.asset_info(image_url) or {}
+        images_with_metadata.append({
+            "id": i,
+            "url": image_url,
+            "immutable_url": image_service.immutable_url(image_url),
+            "alt": f"{product.title} - Vista {i+1}",
+            "is_primary": i == 0,
+            "type": "product_image",
+            "hash": asset.get("hash"),
+            "width": asset.get("width"),
+            "height": asset.get("height"),
+            "bytes": asset.get("size"),
+            "sizes": sizes,
+            "srcset": ", ".join(f"{s['url']} {s['width']}w" for s in sizes)
+        })
+    
+    return {
+        "product_id": product.id,
+        "product_title": product.title,
+        "format": fmt,
+        "images": images_with_metadata,
+        "total_images": len(images_with_metadata),
+        "primary_image": images_with_metadata[0] if images_with_metadata else None
+    }
+
 @router.get("/{product_id}/images")
 async def get_product_images_detailed(
-    product_id: str = Path(..., description="ID único del producto")
+    request: Request,
+    response: Response,
+    product_id: str = Path(..., description="ID único del producto"),
+    accept: Optional[str] = Header(None),
+    service: ProductService = Depends(get_service)
 ):
     """
-    Obtiene información detallada de las imágenes de un producto
+    Obtiene información detallada de las imágenes de un producto,
+    con derivados por tamaño (`srcset`) en el formato aceptado por el cliente.
     """
     await asyncio.sleep(0.1)  # Simular latencia
     
     try:
-        product = await product_service.get_product_by_id(product_id)
+        product = await service.get_product_by_id(product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Producto {product_id} no encontrado")
         
-        # Procesar imágenes para incluir metadatos
-        images_with_metadata = []
-        for i, image_url in enumerate(product.images):
-            images_with_metadata.append({
-                "id": i,
-                "url": image_url,
-                "alt": f"{product.title} - Vista {i+1}",
-                "is_primary": i == 0,
-                "type": "product_image"
-            })
-        
-        return {
-            "product_id": product_id,
-            "product_title": product.title,
-            "images": images_with_metadata,
-            "total_images": len(images_with_metadata),
-            "primary_image": images_with_metadata[0] if images_with_metadata else None
-        }
+        images = await _image_metadata(product, image_service.negotiate_format(accept), request)
+        response.headers["Vary"] = f"Accept, {SITE_HEADER}"
+        return images
         
+    except (HTTPException, ExecutorBusy, ClientDisconnected):
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error obteniendo imágenes: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error obteniendo imágenes: {str(e)}")
+
+@router.get("/{product_id}/page")
+async def get_product_page(
+    request: Request,
+    product_id: str = Path(..., description="ID único del producto"),
+    include: Optional[str] = Query(
+        None,
+        description=f"Partes a incluir separadas por coma: {', '.join(PAGE_PARTS)} (por defecto, todas)"
+    ),
+    related_limit: int = Query(RELATED_LIMIT, ge=1, le=RELATED_LIMIT, description="Máximo de relacionados"),
+    accept: Optional[str] = Header(None),
+    service: ProductService = Depends(get_service)
+):
+    """
+    Página de producto completa en un solo request.
+    
+    Resuelve el detalle una vez y arma a partir de él las partes pedidas
+    (producto, vendedor, relacionados, imágenes, breadcrumb de categorías),
+    en lugar de que cada endpoint vuelva a pedir el detalle.
+    """
+    parts = _parse_parts(include)
+    
+    await asyncio.sleep(0.15)  # Simular latencia (una vez para toda la página)
+    
+    product = await service.get_product_by_id(product_id)
+    if not product:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Producto con ID '{product_id}' no encontrado"
+        )
+    
+    related = product.related_products[:related_limit]
+    page: Dict[str, Any] = {}
+    if "product" in parts:
+        page["product"] = product.model_dump(exclude={"seller", "related_products"})
+    if "seller" in parts:
+        page["seller"] = product.seller
+    if "related" in parts:
+        page["related"] = related
+    
+    # Las partes que requieren trabajo extra se resuelven en paralelo
+    fmt = image_service.negotiate_format(accept)
+    pending = {}
+    if "images" in parts:
+        pending["images"] = _image_metadata(product, fmt, request)
+    if "breadcrumb" in parts:
+        pending["breadcrumb"] = service.get_breadcrumb(product.category_id)
+    for part, value in zip(pending, await asyncio.gather(*pending.values())):
+        page[part] = value
+    
+    keys = surrogate_keys(
+        [product.id] + [p.id for p in related],
+        [product.category_id],
+        [product.seller_id] + [p.seller.id for p in related if p.seller],
+        site=service.site_id
+    )
+    headers = cache_headers(DETAIL_CACHE_CONTROL, keys, vary=["Accept"] if "images" in parts else ())
+    return FastJSONResponse(page, headers=headers)
+
+@router.post("/", response_model=ProductResponse, status_code=201)
+async def create_product(
+    product_in: ProductCreate,
+    service: ProductService = Depends(get_service)
+):
+    """
+    Crea un producto nuevo.
+    """
+    try:
+        product = await service.create_product(product_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    request_coalescer.forget()
+    
+    return FastJSONResponse(product, status_code=201)
+
+@router.put("/{product_id}", response_model=ProductResponse)
+async def replace_product(
+    product_in: ProductCreate,
+    product_id: str = Path(..., description="ID único del producto"),
+    service: ProductService = Depends(get_service)
+):
+    """
+    Reemplaza los datos editables de un producto.
+    """
+    try:
+        product = await service.replace_product(product_id, product_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    request_coalescer.forget()
+    
+    if not product:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Producto con ID '{product_id}' no encontrado"
+        )
+    
+    return FastJSONResponse(product)
+
+@router.patch("/stock", response_model=StockBulkUpdateResponse)
+async def bulk_update_stock(
+    payload: StockBulkUpdate,
+    service: ProductService = Depends(get_service)
+):
+    """
+    Actualiza stock y/o precio de un lote de productos.
+    
+    Cada ítem puede incluir `version` para concurrencia optimista; el
+    resultado se informa por ítem.
+    """
+    results = await service.bulk_update_stock(payload.items)
+    request_coalescer.forget()
+    updated = sum(1 for r in results if r.status == "updated")
+    
+    return FastJSONResponse(StockBulkUpdateResponse(
+        results=results,
+        updated=updated,
+        failed=len(results) - updated
+    ))
+
+@router.patch("/{product_id}", response_model=ProductResponse)
+async def update_product(
+    product_in: ProductUpdate,
+    product_id: str = Path(..., description="ID único del producto"),
+    service: ProductService = Depends(get_service)
+):
+    """
+    Actualiza parcialmente un producto.
+    """
+    product = await service.update_product(product_id, product_in)
+    request_coalescer.forget()
+    
+    if not product:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Producto con ID '{product_id}' no encontrado"
+        )
+    
+    return FastJSONResponse(product)
+
+@router.delete("/{product_id}", status_code=204)
+async def delete_product(
+    product_id: str = Path(..., description="ID único del producto"),
+    service: ProductService = Depends(get_service)
+):
+    """
+    Elimina un producto.
+    """
+    deleted = await service.delete_product(product_id)
+    request_coalescer.forget()
+    
+    if not deleted:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Producto con ID '{product_id}' no encontrado"
+        )
+    
+    return Response(status_code=204)
@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedTier(Protocol):
+    """Subconjunto del protocolo de Redis que usa el cache (redis.asyncio lo cumple)"""
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> Any: ...
+
+    async def delete(self, *keys: str) -> int: ...
+
+    async def incr(self, key: str) -> int: ...
+
+
+class InMemorySharedTier:
+    """
+    Stand-in local con el mismo protocolo que Redis.
+
+    Sirve para tests y desarrollo: varias instancias de ProductService pueden
+    compartir el mismo objeto para simular workers.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._alive(key)
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (value, expires_at)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    async def incr(self, key: str) -> int:
+        value = int(self._alive(key) or 0) + 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+
+class CacheEntry:
+    __slots__ = ("value", "stored_at", "ttl", "stale_ttl", "size")
+
+    def __init__(self, value: Any, stored_at: float, ttl: float, stale_ttl: float, size: int):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.size = size
+
+    def age(self, now: float) -> float:
+        return now - self.stored_at
+
+    def is_fresh(self, now: float) -> bool:
+        return self.age(now) < self.ttl
+
+    def is_usable(self, now: float) -> bool:
+        """Fresca o dentro de la ventana stale-while-revalidate"""
+        return self.age(now) < self.ttl + self.stale_ttl
+
+
+class LocalCache:
+    """LRU en proceso acotado por bytes, con TTL por entrada"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None or not entry.is_usable(time.time() if now is None else now):
+            if entry is not None:
+                self.delete(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.evictions += 1
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredCache:
+    """
+    Cache de dos niveles: LRU en proceso y, opcionalmente, un nivel compartido
+    entre workers con protocolo Redis.
+
+    - Las claves llevan la versión de su namespace; `bump()` invalida todo un
+      namespace en todos los workers sin borrar clave por clave.
+    - `get_or_load()` sirve entradas vencidas dentro de la ventana
+      stale-while-revalidate y las recalcula en segundo plano.
+    """
+
+    def __init__(
+        self,
+        local: Optional[LocalCache] = None,
+        shared: Optional[SharedTier] = None,
+        prefix: str = "meli",
+        version_ttl: float = 1.0
+    ):
+        self.local = local or LocalCache()
+        self.shared = shared
+        self.prefix = prefix
+        self.version_ttl = version_ttl
+        self._versions: Dict[str, int] = {}
+        self._versions_checked_at: Dict[str, float] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def version(self, namespace: str) -> int:
+        """
+        Versión actual de un namespace.
+
+        Con nivel compartido se relee como mucho cada `version_ttl` segundos,
+        así un bump de otro worker se ve con ese retraso máximo.
+        """
+        if self.shared is not None:
+            now = time.monotonic()
+            checked_at = self._versions_checked_at.get(namespace)
+            if checked_at is None or now - checked_at >= self.version_ttl:
+                raw = await self.shared.get(f"{self.prefix}:version:{namespace}")
+                self._versions[namespace] = int(raw) if raw else 0
+                self._versions_checked_at[namespace] = now
+        return self._versions.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> int:
+        """Invalida un namespace completo incrementando su versión"""
+        if self.shared is not None:
+            version = await self.shared.incr(f"{self.prefix}:version:{namespace}")
+            self._versions_checked_at[namespace] = time.monotonic()
+        else:
+            version = self._versions.get(namespace, 0) + 1
+        self._versions[namespace] = version
+        return version
+
+    async def key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:v{await self.version(namespace)}:{key}"
+
+    async def _get_entry(self, full_key: str) -> Optional[CacheEntry]:
+        now = time.time()
+        entry = self.local.get(full_key, now)
+        if entry is not None or self.shared is None:
+            return entry
+
+        raw = await self.shared.get(full_key)
+        if raw is None:
+            return None
+        stored_at, ttl, stale_ttl, value = pickle.loads(raw)
+        entry = CacheEntry(value, stored_at, ttl, stale_ttl, len(raw))
+        if not entry.is_usable(now):
+            return None
+        self.local.set(full_key, entry)
+        return entry
+
+    async def _set_entry(self, full_key: str, value: Any, ttl: float, stale_ttl: float) -> CacheEntry:
+        stored_at = time.time()
+        raw = pickle.dumps((stored_at, ttl, stale_ttl, value), protocol=pickle.HIGHEST_PROTOCOL)
+        entry = CacheEntry(value, stored_at, ttl, stale_ttl, len(raw))
+        self.local.set(full_key, entry)
+        if self.shared is not None:
+            await self.shared.set(full_key, raw, ex=max(1, int(ttl + stale_ttl)))
+        return entry
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = await self._get_entry(await self.key(namespace, key))
+        return entry.value if entry is not None else None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float = 60, stale_ttl: float = 0):
+        await self._set_entry(await self.key(namespace, key), value, ttl, stale_ttl)
+
+    async def delete(self, namespace: str, *keys: str):
+        """Borra claves puntuales en ambos niveles"""
+        if not keys:
+            return
+        version = await self.version(namespace)
+        full_keys = [f"{self.prefix}:{namespace}:v{version}:{key}" for key in keys]
+        for full_key in full_keys:
+            self.local.delete(full_key)
+        if self.shared is not None:
+            await self.shared.delete(*full_keys)
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float = 60,
+        stale_ttl: float = 0
+    ) -> Any:
+        """
+        Devuelve el valor cacheado o lo calcula con `loader`.
+
+        Si la entrada está vencida pero dentro de `stale_ttl`, se devuelve tal
+        cual y se programa un único refresco en segundo plano por clave.
+        """
+        full_key = await self.key(namespace, key)
+        entry = await self._get_entry(full_key)
+
+        if entry is not None:
+            if not entry.is_fresh(time.time()) and full_key not in self._refreshing:
+                self._refreshing[full_key] = asyncio.create_task(
+                    self._revalidate(full_key, loader, ttl, stale_ttl)
+                )
+            return entry.value
+
+        value = await loader()
+        if value is not None:
+            await self._set_entry(full_key, value, ttl, stale_ttl)
+        return value
+
+    async def _revalidate(self, full_key: str, loader, ttl: float, stale_ttl: float):
+        try:
+            value = await loader()
+            if value is not None:
+                await self._set_entry(full_key, value, ttl, stale_ttl)
+        except Exception as e:
+            logger.error(f"Error revalidando cache [{full_key}]: {str(e)}")
+        finally:
+            self._refreshing.pop(full_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+        }
+
+
+def create_shared_tier() -> Optional[SharedTier]:
+    """Nivel compartido según CACHE_BACKEND (memory | redis | none)"""
+    backend = os.getenv("CACHE_BACKEND", "none").lower()
+
+    if backend == "memory":
+        return InMemorySharedTier()
+
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.error("CACHE_BACKEND=redis requiere el paquete 'redis'; se usa solo el cache local")
+            return None
+        return redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+
+    return None
+
+
+def create_cache(prefix: str = "meli") -> TieredCache:
+    return TieredCache(
+        local=LocalCache(max_bytes=int(os.getenv("CACHE_MAX_BYTES", 32 * 1024 * 1024))),
+        shared=create_shared_tier(),
+        prefix=prefix
+    )
@@ -0,0 +1,372 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.columnar_index import (SORT_OPTIONS, ColumnarIndex,
+                                         vectorized_available)
+from app.services.fuzzy_index import TrigramIndex, words
+from app.services.normalization import NORMALIZED_ATTRIBUTES, normalize_product
+
+# Rango por atributo normalizado: (mínimo, máximo), cualquiera puede ser None
+AttributeRanges = Dict[str, Tuple[Optional[float], Optional[float]]]
+
+
+class SortedIndex:
+    """Índice ordenado por valor numérico para filtros por rango"""
+
+    def __init__(self):
+        self._keys: List[Tuple[float, str]] = []
+        self._values: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, product_id: str, value: float):
+        """Inserta (o reubica) un producto en el orden"""
+        if product_id in self._values:
+            self.remove(product_id)
+        self._values[product_id] = value
+        insort(self._keys, (value, product_id))
+
+    def remove(self, product_id: str):
+        """Quita un producto del orden si existe"""
+        value = self._values.pop(product_id, None)
+        if value is None:
+            return
+        position = bisect_left(self._keys, (value, product_id))
+        del self._keys[position]
+
+    def range(self, min_value: Optional[float] = None, max_value: Optional[float] = None) -> List[str]:
+        """IDs cuyo valor está en [min_value, max_value], en orden ascendente"""
+        start = 0 if min_value is None else bisect_left(self._keys, (min_value,))
+        # "\uffff" ordena después de cualquier ID para incluir valores iguales a max_value
+        end = len(self._keys) if max_value is None else bisect_right(self._keys, (max_value, "\uffff"))
+        return [product_id for _, product_id in self._keys[start:end]]
+
+
+class CatalogIndex:
+    """
+    Índices en memoria del catálogo.
+
+    Mantiene el mapa por ID, las listas por categoría, el orden por precio y
+    por cada atributo normalizado (ventas, RAM, pantalla...), las postings de
+    búsqueda y el vocabulario por trigramas para la búsqueda tolerante a
+    errores. Cada escritura actualiza solo las entradas del
+    producto afectado, sin reconstruir el resto.
+
+    Con numpy instalado mantiene además las columnas de `ColumnarIndex` y los
+    listados se evalúan vectorizados; sin numpy se usa el camino en Python.
+    """
+
+    def __init__(self, products: Iterable[Dict] = (), vectorized: Optional[bool] = None):
+        if vectorized is None:
+            vectorized = vectorized_available()
+        self.columns: Optional[ColumnarIndex] = ColumnarIndex() if vectorized else None
+        self.products: Dict[str, Dict] = {}
+        self.by_category: Dict[str, Dict[str, None]] = {}
+        self.by_price = SortedIndex()
+        self.attributes: Dict[str, Dict[str, float]] = {}
+        self.by_attribute: Dict[str, SortedIndex] = {name: SortedIndex() for name in NORMALIZED_ATTRIBUTES}
+        self.postings: Dict[str, Set[str]] = {}
+        self.terms = TrigramIndex()
+        self._positions: Dict[str, int] = {}
+        self._next_position = 0
+        self.version = 0
+
+        for product in products:
+            self.upsert(product)
+
+        # La versión cuenta escrituras posteriores a la carga inicial
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.products
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        return self.products.get(product_id)
+
+    @staticmethod
+    def _tokens(product: Dict) -> Set[str]:
+        """Tokens de búsqueda (separados por espacios, en minúsculas)"""
+        text = f"{product.get('title', '')} {product.get('description', '')}"
+        return set(text.lower().split())
+
+    @staticmethod
+    def _terms(product: Dict) -> Set[str]:
+        """Vocabulario para la búsqueda tolerante a errores: título, marca y specs"""
+        terms = set(words(product.get("title")))
+        terms.update(words(product.get("brand")))
+        for spec in product.get("specifications") or ():
+            terms.update(words(spec.get("value")))
+        return terms
+
+    def upsert(self, product: Dict):
+        """Inserta o reemplaza un producto actualizando todos los índices"""
+        product_id = product["id"]
+        previous = self.products.get(product_id)
+
+        if previous is None:
+            self._positions[product_id] = self._next_position
+            self._next_position += 1
+            self.products[product_id] = product
+            self._index(product)
+            self.version += 1
+            return
+
+        self.products[product_id] = product
+
+        attributes = normalize_product(product)
+        previous_attributes = self.attributes[product_id]
+        if attributes != previous_attributes:
+            self.attributes[product_id] = attributes
+            for name in previous_attributes.keys() - attributes.keys():
+                self.by_attribute[name].remove(product_id)
+            for name, value in attributes.items():
+                if previous_attributes.get(name) != value:
+                    self.by_attribute[name].add(product_id, value)
+
+        if self.columns is not None:
+            self.columns.upsert(product, attributes)
+
+        # Solo se tocan los índices cuyos campos cambiaron
+        if previous["category_id"] != product["category_id"]:
+            self._remove_from_category(previous)
+            self.by_category.setdefault(product["category_id"], {})[product_id] = None
+
+        if previous["price"] != product["price"]:
+            self.by_price.add(product_id, product["price"])
+
+        old_tokens = self._tokens(previous)
+        new_tokens = self._tokens(product)
+        if old_tokens != new_tokens:
+            self._remove_postings(product_id, old_tokens - new_tokens)
+            for token in new_tokens - old_tokens:
+                self.postings.setdefault(token, set()).add(product_id)
+
+        old_terms = self._terms(previous)
+        new_terms = self._terms(product)
+        if old_terms != new_terms:
+            self.terms.remove(product_id, old_terms - new_terms)
+            self.terms.add(product_id, new_terms - old_terms)
+
+        self.version += 1
+
+    def remove(self, product_id: str) -> Optional[Dict]:
+        """Elimina un producto de todos los índices"""
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return None
+
+        self._unindex(product)
+        del self._positions[product_id]
+        self.version += 1
+        return product
+
+    def _index(self, product: Dict):
+        product_id = product["id"]
+        self.by_category.setdefault(product["category_id"], {})[product_id] = None
+        self.by_price.add(product_id, product["price"])
+        for token in self._tokens(product):
+            self.postings.setdefault(token, set()).add(product_id)
+        self.terms.add(product_id, self._terms(product))
+        attributes = self.attributes[product_id] = normalize_product(product)
+        for name, value in attributes.items():
+            self.by_attribute[name].add(product_id, value)
+        if self.columns is not None:
+            self.columns.upsert(product, attributes)
+
+    def _unindex(self, product: Dict):
+        if self.columns is not None:
+            self.columns.remove(product["id"])
+        for name in self.attributes.pop(product["id"], {}):
+            self.by_attribute[name].remove(product["id"])
+        self._remove_from_category(product)
+        self.by_price.remove(product["id"])
+        self._remove_postings(product["id"], self._tokens(product))
+        self.terms.remove(product["id"], self._terms(product))
+
+    def _remove_from_category(self, product: Dict):
+        category = self.by_category.get(product["category_id"])
+        if category is not None:
+            category.pop(product["id"], None)
+            if not category:
+                del self.by_category[product["category_id"]]
+
+    def _remove_postings(self, product_id: str, tokens: Iterable[str]):
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.discard(product_id)
+                if not postings:
+                    del self.postings[token]
+
+    def category_ids(self, category_id: str) -> List[str]:
+        """IDs de una categoría en orden de catálogo"""
+        return list(self.by_category.get(category_id, ()))
+
+    def _search_candidates(self, search_lower: str) -> Optional[Set[str]]:
+        """
+        Candidatos para una búsqueda por subcadena.
+
+        Cada palabra de la consulta debe estar contenida en algún token del
+        producto, así que basta con unir las postings de los tokens que la
+        contienen. Devuelve None si la consulta no tiene palabras.
+        """
+        candidates: Optional[Set[str]] = None
+        for word in set(search_lower.split()):
+            if word in self.postings:
+                matches = set(self.postings[word])
+            else:
+                matches = set()
+            for token, postings in self.postings.items():
+                if word in token and token != word:
+                    matches |= postings
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return set()
+        return candidates
+
+    def _fuzzy_matches(self, search: str) -> Set[str]:
+        """IDs con un término parecido a cada palabra de la búsqueda, en cualquier orden"""
+        candidates: Optional[Set[str]] = None
+        for word in set(words(search)):
+            matches = self.terms.matches(word)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    def suggest(self, search: str) -> Optional[str]:
+        """Búsqueda corregida ("quizás quisiste decir") o None si no hay nada que corregir"""
+        original = words(search)
+        corrected = [self.terms.suggest(word) or word for word in original]
+        return " ".join(corrected) if corrected != original else None
+
+    def _search_matches(
+        self,
+        search: str,
+        pool: Optional[Iterable[str]] = None,
+        fuzzy: bool = False
+    ) -> Set[str]:
+        """
+        IDs cuyo título o descripción contienen la búsqueda (dentro de `pool`).
+
+        Con `fuzzy`, en cambio, cada palabra debe parecerse a algún término
+        del título o las specs del producto.
+        """
+        if fuzzy:
+            matches = self._fuzzy_matches(search)
+            return matches if pool is None else matches & set(pool)
+
+        search_lower = search.lower()
+        matches = self._search_candidates(search_lower)
+        if matches is not None:
+            pool = matches if pool is None else matches & set(pool)
+        elif pool is None:
+            pool = self.products
+        # Verificación exacta de la subcadena sobre los candidatos
+        return {
+            product_id for product_id in pool
+            if search_lower in self.products[product_id]["title"].lower()
+            or search_lower in self.products[product_id]["description"].lower()
+        }
+
+    def query(
+        self,
+        category_id: Optional[str] = None,
+        search: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        free_shipping: Optional[bool] = None,
+        condition: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        ranges: Optional[AttributeRanges] = None,
+        fuzzy: bool = False
+    ) -> List[str]:
+        """IDs que cumplen los filtros, en orden de catálogo"""
+        candidates: Optional[Set[str]] = None
+
+        if category_id:
+            candidates = set(self.by_category.get(category_id, ()))
+
+        if min_price is not None or max_price is not None:
+            in_range = set(self.by_price.range(min_price, max_price))
+            candidates = in_range if candidates is None else candidates & in_range
+
+        for name, (min_value, max_value) in (ranges or {}).items():
+            in_range = set(self.by_attribute[name].range(min_value, max_value))
+            candidates = in_range if candidates is None else candidates & in_range
+
+        if search:
+            candidates = self._search_matches(search, candidates, fuzzy)
+
+        if free_shipping is not None or condition or min_rating is not None:
+            # Un solo recorrido para todos los atributos sin índice propio
+            pool = self.products if candidates is None else candidates
+            candidates = {
+                product_id for product_id in pool
+                if (free_shipping is None or bool(self.products[product_id].get("free_shipping")) == free_shipping)
+                and (not condition or self.products[product_id].get("condition") == condition)
+                and (min_rating is None or (self.products[product_id].get("rating") or 0) >= min_rating)
+            }
+
+        if candidates is None:
+            return list(self.products)
+
+        return sorted(candidates, key=self._positions.__getitem__)
+
+    def query_page(
+        self,
+        category_id: Optional[str] = None,
+        search: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        free_shipping: Optional[bool] = None,
+        condition: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        ranges: Optional[AttributeRanges] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20,
+        fuzzy: bool = False
+    ) -> Tuple[List[str], int]:
+        """Página de IDs filtrada y ordenada, y total de coincidencias"""
+        unknown = set(ranges or ()) - set(NORMALIZED_ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Atributos no filtrables: {', '.join(sorted(unknown))}")
+
+        if self.columns is not None:
+            mask = self.columns.mask(category_id, min_price, max_price, free_shipping, condition, min_rating, ranges)
+            if search:
+                mask &= self.columns.rows_mask(self._search_matches(search, fuzzy=fuzzy))
+            return self.columns.select(mask, sort, skip, limit)
+
+        product_ids = self.query(
+            category_id, search, min_price, max_price, free_shipping, condition, min_rating, ranges, fuzzy
+        )
+        total = len(product_ids)
+        if sort is not None:
+            product_ids = heapq.nsmallest(skip + limit, product_ids, key=self._sort_key(sort))
+        return product_ids[skip:skip + limit], total
+
+    def _sort_key(self, sort: str):
+        """Clave de orden: valor (sin valor al final) y desempate por orden de catálogo"""
+        field, descending = SORT_OPTIONS[sort]
+        sign = -1 if descending else 1
+        positions = self._positions
+
+        if field in self.by_attribute:
+            attributes = self.attributes
+
+            def key(product_id: str):
+                value = attributes[product_id].get(field)
+                if value is None:
+                    return (1, 0, positions[product_id])
+                return (0, sign * value, positions[product_id])
+            return key
+
+        products = self.products
+        return lambda product_id: (0, sign * (products[product_id].get(field) or 0), positions[product_id])
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.product import Product, Seller
+from app.services.catalog_index import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "catalog.snapshot"
+SNAPSHOT_FORMAT = 4
+SOURCE_FILES = ("products.json", "sellers.json", "categories.json")
+
+
+def _fingerprint(data_path: Path) -> Dict[str, Tuple[int, int]]:
+    """Tamaño y mtime de los JSON fuente (solo stat, sin leerlos)"""
+    fingerprint = {}
+    for filename in SOURCE_FILES:
+        stat = (data_path / filename).stat()
+        fingerprint[filename] = (stat.st_size, stat.st_mtime_ns)
+    return fingerprint
+
+
+def write_snapshot(
+    data_path: Path,
+    catalog: CatalogIndex,
+    sellers: List[Dict],
+    categories: List[Dict]
+) -> Path:
+    """Serializa el catálogo ya indexado junto con la huella de los JSON fuente"""
+    data_path = Path(data_path)
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "sources": _fingerprint(data_path),
+        "catalog": catalog,
+        "sellers": sellers,
+        "categories": categories,
+    }
+
+    target = data_path / SNAPSHOT_FILE
+    tmp_path = target.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, target)
+    return target
+
+
+def load_catalog(products_path: str) -> CatalogIndex:
+    """
+    Parsea products.json y construye los índices (función de módulo para
+    poder correr en el pool de procesos)
+    """
+    with open(products_path, 'r', encoding='utf-8') as f:
+        return CatalogIndex(json.load(f)["products"])
+
+
+def build_snapshot(data_path: str = "app/data") -> Path:
+    """
+    Compila el snapshot desde los JSON: valida cada producto y vendedor con
+    los modelos y construye los índices una sola vez.
+    """
+    data_path = Path(data_path)
+
+    def load(filename: str) -> Dict[str, Any]:
+        with open(data_path / filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    products = load("products.json")["products"]
+    sellers = load("sellers.json")["sellers"]
+    categories = load("categories.json")["categories"]
+
+    # Falla en build si algún registro no es válido, no en el primer request
+    for product in products:
+        Product.model_validate(product)
+    for seller in sellers:
+        Seller.model_validate(seller)
+
+    return write_snapshot(data_path, CatalogIndex(products), sellers, categories)
+
+
+def load_snapshot(data_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Carga el snapshot si existe y coincide con los JSON actuales.
+
+    El snapshot es un pickle generado localmente por el build; nunca debe
+    cargarse desde una fuente no confiable.
+    """
+    path = Path(data_path) / SNAPSHOT_FILE
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Snapshot ilegible, se usan los JSON: {str(e)}")
+        return None
+
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        logger.warning("Snapshot con formato distinto, se usan los JSON")
+        return None
+
+    try:
+        current = _fingerprint(Path(data_path))
+    except OSError:
+        return None
+    if {k: tuple(v) for k, v in snapshot["sources"].items()} != current:
+        logger.warning("Snapshot desactualizado respecto de los JSON, se usan los JSON")
+        return None
+
+    return snapshot
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = time.perf_counter()
+    target = build_snapshot(sys.argv[1] if len(sys.argv) > 1 else "app/data")
+    print(f"✅ Snapshot generado: {target} ({time.perf_counter() - start:.3f}s)")
@@ -0,0 +1,60 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class RequestCoalescer:
+    """
+    Deduplica lecturas idénticas concurrentes.
+
+    El primer request con una clave lanza el cálculo como tarea; los que llegan
+    mientras sigue en curso esperan esa misma tarea en lugar de repetirlo. La
+    tarea no depende de ningún request en particular: si el cliente que la
+    inició se desconecta, el resto igual recibe el resultado. Solo deduplica
+    lo que está en vuelo, no cachea.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        self.executed: Counter = Counter()
+        self.coalesced: Counter = Counter()
+
+    async def run(self, route: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecuta `loader` o se suma a una ejecución idéntica en curso"""
+        full_key = (route, key)
+        task = self._in_flight.get(full_key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._in_flight[full_key] = task
+            task.add_done_callback(lambda done: self._finish(full_key, done))
+            self.executed[route] += 1
+        else:
+            self.coalesced[route] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, full_key: Tuple[str, Hashable], task: asyncio.Task):
+        if self._in_flight.get(full_key) is task:
+            del self._in_flight[full_key]
+        if not task.cancelled():
+            task.exception()  # evita el warning si todos los que esperaban se fueron
+
+    def forget(self):
+        """
+        Tras una escritura, los requests nuevos no se suman a cálculos que
+        empezaron antes (los que ya esperaban reciben su resultado igual).
+        """
+        self._in_flight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        routes = sorted(set(self.executed) | set(self.coalesced))
+        return {
+            "in_flight": len(self._in_flight),
+            "routes": {
+                route: {"executed": self.executed[route], "coalesced": self.coalesced[route]}
+                for route in routes
+            },
+        }
+
+
+# Instancia global (por worker)
+request_coalescer = RequestCoalescer()
@@ -0,0 +1,199 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.normalization import NORMALIZED_ATTRIBUTES
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependencia opcional
+    np = None
+
+
+# Orden del listado: campo numérico y si es descendente
+SORT_OPTIONS: Dict[str, Tuple[str, bool]] = {
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+    "rating_desc": ("rating", True),
+    "reviews_desc": ("reviews_count", True),
+    "sold_desc": ("sold_quantity", True),
+    "ram_desc": ("ram_gb", True),
+    "storage_desc": ("storage_gb", True),
+    "screen_desc": ("screen_in", True),
+}
+
+
+def vectorized_available() -> bool:
+    return np is not None
+
+
+class ColumnarIndex:
+    """
+    Atributos numéricos y booleanos del catálogo como columnas NumPy.
+
+    Cada producto ocupa una fila en orden de catálogo. Los filtros combinados
+    se evalúan como máscaras booleanas sobre todas las filas a la vez y el
+    top-k ordenado usa `argpartition`, sin listas intermedias en Python.
+    Los atributos normalizados (ventas, RAM, pantalla...) son columnas
+    float con NaN donde el producto no tiene el dato: NaN no cumple ningún
+    rango y queda al final de cualquier orden.
+    Las bajas marcan la fila como muerta; las filas se reacomodan cuando
+    las muertas son mayoría.
+    """
+
+    COLUMNS = {
+        "price": "float64",
+        "rating": "float64",
+        "reviews_count": "int64",
+        "stock": "int64",
+        "free_shipping": "bool",
+        "condition": "int32",
+        "category": "int32",
+        **{attribute: "float64" for attribute in NORMALIZED_ATTRIBUTES},
+    }
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise RuntimeError("ColumnarIndex requiere numpy")
+        self.size = 0
+        self.dead = 0
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.codes: Dict[str, Dict[str, int]] = {"condition": {}, "category": {}}
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _code(self, kind: str, value: str) -> int:
+        codes = self.codes[kind]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def _grow(self):
+        capacity = max(1024, len(self.alive) * 2)
+        self.alive = np.resize(self.alive, capacity)
+        self.alive[self.size:] = False
+        for name, column in self.columns.items():
+            self.columns[name] = np.resize(column, capacity)
+
+    def upsert(self, product: Dict, attributes: Optional[Dict[str, float]] = None):
+        """Escribe la fila del producto (la agrega al final si es nuevo)"""
+        row = self.rows.get(product["id"])
+        if row is None:
+            if self.size == len(self.alive):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[product["id"]] = row
+            self.ids.append(product["id"])
+            self.alive[row] = True
+
+        columns = self.columns
+        columns["price"][row] = product["price"]
+        columns["rating"][row] = product.get("rating") or 0.0
+        columns["reviews_count"][row] = product.get("reviews_count") or 0
+        columns["stock"][row] = product.get("stock") or 0
+        columns["free_shipping"][row] = bool(product.get("free_shipping"))
+        columns["condition"][row] = self._code("condition", product.get("condition", ""))
+        columns["category"][row] = self._code("category", product["category_id"])
+        attributes = attributes or {}
+        for attribute in NORMALIZED_ATTRIBUTES:
+            columns[attribute][row] = attributes.get(attribute, np.nan)
+
+    def remove(self, product_id: str):
+        row = self.rows.pop(product_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self.ids[row] = None
+        self.dead += 1
+        if self.dead > 1024 and self.dead * 2 > self.size:
+            self._compact()
+
+    def _compact(self):
+        """Descarta las filas muertas conservando el orden de catálogo"""
+        keep = np.flatnonzero(self.alive[:self.size])
+        self.ids = [self.ids[row] for row in keep]
+        self.rows = {product_id: row for row, product_id in enumerate(self.ids)}
+        for name, column in self.columns.items():
+            self.columns[name] = column[keep].copy()
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.size = len(keep)
+        self.dead = 0
+
+    def rows_mask(self, product_ids: Iterable[str]):
+        """Máscara con las filas de un conjunto de IDs"""
+        mask = np.zeros(self.size, dtype=bool)
+        rows = [self.rows[product_id] for product_id in product_ids if product_id in self.rows]
+        mask[rows] = True
+        return mask
+
+    def mask(
+        self,
+        category_id: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        free_shipping: Optional[bool] = None,
+        condition: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+    ):
+        """Máscara booleana con todos los predicados combinados"""
+        columns = {name: column[:self.size] for name, column in self.columns.items()}
+        mask = self.alive[:self.size].copy()
+
+        if category_id:
+            code = self.codes["category"].get(category_id)
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= columns["category"] == code
+        if condition:
+            code = self.codes["condition"].get(condition)
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= columns["condition"] == code
+        if min_price is not None:
+            mask &= columns["price"] >= min_price
+        if max_price is not None:
+            mask &= columns["price"] <= max_price
+        if free_shipping is not None:
+            mask &= columns["free_shipping"] == free_shipping
+        if min_rating is not None:
+            mask &= columns["rating"] >= min_rating
+        for attribute, (min_value, max_value) in (ranges or {}).items():
+            # NaN (sin dato) da False en cualquier comparación
+            column = columns[attribute]
+            mask &= ~np.isnan(column)
+            if min_value is not None:
+                mask &= column >= min_value
+            if max_value is not None:
+                mask &= column <= max_value
+        return mask
+
+    def select(self, mask, sort: Optional[str] = None, skip: int = 0, limit: int = 20) -> Tuple[List[str], int]:
+        """Página de IDs que cumplen la máscara y total de coincidencias"""
+        matches = np.flatnonzero(mask)
+        total = len(matches)
+
+        if sort is None:
+            page = matches[skip:skip + limit]
+        else:
+            field, descending = SORT_OPTIONS[sort]
+            keys = self.columns[field][matches]
+            if descending:
+                keys = -keys
+            k = skip + limit
+            if k < total:
+                # Solo se ordenan los k primeros (más los empatados con el
+                # k-ésimo, para desempatar igual), no todas las coincidencias
+                kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+                if not np.isnan(kth):  # con NaN en el corte hacen falta también los sin dato
+                    top = keys <= kth
+                    matches, keys = matches[top], keys[top]
+            # Empates en orden de catálogo (la fila), igual que sin numpy
+            order = np.lexsort((matches, keys))
+            page = matches[order][skip:skip + limit]
+
+        return [self.ids[row] for row in page], total
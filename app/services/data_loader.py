@@ -0,0 +1,80 @@
+import asyncio
+from typing import (Awaitable, Callable, Dict, Generic, Hashable, Iterable,
+                    List, Optional, TypeVar)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Agrupa las búsquedas por clave hechas en la misma vuelta del event loop.
+
+    Cada `load()` devuelve un future; el primero de una tanda programa el
+    despacho con `call_soon`, así todas las claves pedidas por coroutines que
+    corren en esa vuelta (p. ej. un `gather` sobre una página) se resuelven
+    con una sola llamada a `batch_fn`. Las claves ya pedidas se memoizan: la
+    instancia vive lo que dura un request, no es un cache compartido.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]]):
+        self.batch_fn = batch_fn
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self.batches = 0
+        self.keys_loaded = 0
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        """Future con el valor de `key` (None si no existe)"""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return future
+
+    def load_many(self, keys: Iterable[K]) -> "asyncio.Future[List[Optional[V]]]":
+        # No es una coroutine: las claves se encolan ya, en la vuelta actual
+        return asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        asyncio.ensure_future(self._run(keys))
+
+    async def _run(self, keys: List[K]):
+        self.batches += 1
+        self.keys_loaded += len(keys)
+        try:
+            values = await self.batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # Sin memoizar el error: un load posterior reintenta
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+class RequestLoaders:
+    """Loaders de un request: vendedores y categorías por ID"""
+
+    def __init__(
+        self,
+        load_sellers: Callable[[List[str]], Awaitable[Dict[str, Dict]]],
+        load_categories: Callable[[List[str]], Awaitable[Dict[str, Dict]]]
+    ):
+        self.sellers: DataLoader[str, Dict] = DataLoader(load_sellers)
+        self.categories: DataLoader[str, Dict] = DataLoader(load_categories)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "seller_batches": self.sellers.batches,
+            "category_batches": self.categories.batches,
+        }
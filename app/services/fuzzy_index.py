@@ -0,0 +1,135 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+def words(text) -> List[str]:
+    """Palabras en minúsculas (letras, dígitos y acentos; sin puntuación)"""
+    return _WORD.findall(str(text or "").lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    """Trigramas del término con bordes marcados (`$gal`, `xy$`)"""
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word: str) -> int:
+    """
+    Errores tolerados según el largo de la palabra: 0, 1 o 2. Modelos y
+    números (`a55`, `128`) van exactos: `a35` no es un error de `a55`.
+    """
+    if len(word) < 3 or any(char.isdigit() for char in word):
+        return 0
+    return 1 if len(word) < 6 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Distancia de edición con transposiciones (`galxay` -> `galaxy` es 1)
+    o None si supera `limit`. Corta apenas una fila entera supera el límite.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    before: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class TrigramIndex:
+    """
+    Vocabulario del catálogo indexado por trigramas, para búsqueda con
+    errores de tipeo.
+
+    Cada término apunta a los productos que lo contienen y cada trigrama a
+    los términos que lo tienen. Una palabra mal escrita solo recorre las
+    postings de sus propios trigramas: los términos que comparten suficientes
+    trigramas son candidatos y se verifican con la distancia de edición
+    acotada. Una edición rompe a lo sumo 4 trigramas (3, o 4 si es una
+    transposición) y se exige al menos uno en común.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.grams: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.postings
+
+    def add(self, product_id: str, terms: Iterable[str]):
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = set()
+                for gram in trigrams(term):
+                    self.grams.setdefault(gram, set()).add(term)
+            postings.add(product_id)
+
+    def remove(self, product_id: str, terms: Iterable[str]):
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.discard(product_id)
+            if postings:
+                continue
+            del self.postings[term]
+            for gram in trigrams(term):
+                terms_with_gram = self.grams.get(gram)
+                if terms_with_gram is not None:
+                    terms_with_gram.discard(term)
+                    if not terms_with_gram:
+                        del self.grams[gram]
+
+    def similar(self, word: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Términos a distancia de edición acotada de `word`, con su distancia"""
+        if max_distance is None:
+            max_distance = max_edits(word)
+        if max_distance == 0:
+            return [(word, 0)] if word in self.postings else []
+        grams = trigrams(word)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self.grams.get(gram, ()))
+
+        min_shared = max(1, len(grams) - 4 * max_distance)
+        similar = []
+        for term, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = edit_distance(word, term, max_distance)
+            if distance is not None:
+                similar.append((term, distance))
+        return similar
+
+    def matches(self, word: str) -> Set[str]:
+        """Productos con algún término parecido a `word`"""
+        products: Set[str] = set()
+        for term, _ in self.similar(word):
+            products |= self.postings[term]
+        return products
+
+    def suggest(self, word: str) -> Optional[str]:
+        """Término más probable para `word`: el más cercano y, a igual distancia, el más frecuente"""
+        if word in self.postings:
+            return word
+        candidates = self.similar(word)
+        if not candidates:
+            return None
+        term, _ = min(candidates, key=lambda item: (item[1], -len(self.postings[item[0]]), item[0]))
+        return term
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.services.product_service import ProductService, product_service
+from app.services.task_executor import task_executor
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Chequeos de salud costosos calculados en segundo plano.
+
+    Los endpoints de salud leen el último resultado cacheado en lugar de
+    recorrer el filesystem en cada probe del balanceador.
+    """
+
+    def __init__(
+        self,
+        service: ProductService = product_service,
+        static_dir: str = "static",
+        interval: float = 10.0
+    ):
+        self.service = service
+        self.static_dir = Path(static_dir)
+        self.images_dir = self.static_dir / "images" / "products"
+        self.interval = interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _count_images(self) -> int:
+        if not self.images_dir.is_dir():
+            return 0
+        with os.scandir(self.images_dir) as entries:
+            return sum(1 for entry in entries if entry.name.endswith(".svg"))
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recalcula los chequeos costosos y actualiza el cache"""
+        images_count = await task_executor.run_io(self._count_images)
+        self._snapshot = {
+            "static_directory": self.static_dir.exists(),
+            "images_available": images_count,
+            "checked_at": time.time()
+        }
+        return self._snapshot
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """
+        Estado actual: métricas del catálogo (O(1), en vivo) más el último
+        resultado cacheado de los chequeos costosos.
+        """
+        cached = self._snapshot
+        if cached is None:
+            cached = await self.refresh()
+        return {"catalog": self.service.stats(), **cached}
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health check en segundo plano falló: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Inicia el refresco periódico en el event loop actual"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instancia global del monitor
+health_monitor = HealthMonitor(interval=float(os.getenv("HEALTH_CHECK_INTERVAL", 10)))
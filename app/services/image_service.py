@@ -0,0 +1,246 @@
+import hashlib
+import io
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+
+# Pillow y cairosvg se importan recién cuando hace falta renderizar: el
+# arranque y los requests que solo leen el manifest no pagan su import.
+@lru_cache(maxsize=None)
+def _pil_image():
+    try:
+        from PIL import Image
+    except ImportError:  # pragma: no cover - dependencia opcional
+        return None
+    return Image
+
+
+@lru_cache(maxsize=None)
+def _cairosvg():
+    try:
+        import cairosvg
+    except (ImportError, OSError):  # pragma: no cover - requiere libcairo del sistema
+        return None
+    return cairosvg
+
+
+# Anchos de cada derivado (las imágenes de producto son cuadradas)
+DERIVATIVE_SIZES: Dict[str, int] = {
+    "thumbnail": 150,
+    "medium": 400,
+    "full": 600,
+}
+
+CONTENT_TYPES = {
+    "webp": "image/webp",
+    "png": "image/png",
+}
+
+
+class ImageService:
+    """
+    Genera y sirve derivados raster de las imágenes de producto.
+
+    Los derivados se guardan en un directorio direccionado por contenido: el
+    nombre de archivo incluye el hash de la imagen original y el ancho, así que
+    una URL generada nunca cambia de contenido y se puede cachear indefinidamente.
+    Si no hay renderizador disponible para un formato, se usa la imagen original.
+
+    Los metadatos de las imágenes originales (hash, tamaño, dimensiones) salen
+    del manifest que genera create_simple_images.py, que se lee una sola vez;
+    así las respuestas no tocan el filesystem salvo para generar derivados.
+    """
+
+    def __init__(
+        self,
+        static_dir: str = "static",
+        cache_subdir: str = "images/cache",
+        manifest_path: Optional[str] = None
+    ):
+        self.static_dir = Path(static_dir)
+        self.cache_subdir = cache_subdir
+        self.cache_dir = self.static_dir / cache_subdir
+        self.manifest_path = (
+            Path(manifest_path) if manifest_path
+            else self.static_dir / "images" / "products" / "manifest.json"
+        )
+        self._manifest: Optional[Dict[str, Dict]] = None
+        self._derivatives: Optional[Set[str]] = None
+        self._digests: Dict[Tuple[str, int], str] = {}
+
+    @property
+    def manifest(self) -> Dict[str, Dict]:
+        """Assets del manifest indexados por ruta relativa a static/"""
+        if self._manifest is None:
+            self._manifest = self._load_manifest()
+        return self._manifest
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        base_path = data.get("base_path", "").strip("/")
+        return {
+            f"{base_path}/{filename}" if base_path else filename: entry
+            for filename, entry in data.get("assets", {}).items()
+        }
+
+    def reload(self):
+        """Descarta el manifest y el listado de derivados en memoria"""
+        self._manifest = None
+        self._derivatives = None
+
+    def _has_derivative(self, filename: str) -> bool:
+        """Consulta en memoria si un derivado ya fue generado"""
+        if self._derivatives is None:
+            self._derivatives = set(os.listdir(self.cache_dir)) if self.cache_dir.is_dir() else set()
+        return filename in self._derivatives
+
+    @staticmethod
+    def _relative_path(image_url: str) -> Optional[str]:
+        path = urlparse(image_url).path
+        if not path.startswith("/static/"):
+            return None
+        return path[len("/static/"):]
+
+    def asset_info(self, image_url: str) -> Optional[Dict]:
+        """Metadatos del manifest para una imagen original"""
+        relative = self._relative_path(image_url)
+        return self.manifest.get(relative) if relative else None
+
+    def immutable_url(self, image_url: str) -> str:
+        """URL versionada por hash de contenido (cacheable como inmutable)"""
+        info = self.asset_info(image_url)
+        if info is None:
+            return image_url
+        return f"{image_url}?v={info['hash'][:12]}"
+
+    @staticmethod
+    def negotiate_format(accept: Optional[str]) -> str:
+        """Elige el formato de salida según el header Accept"""
+        if accept and "image/webp" in accept and _pil_image() is not None:
+            return "webp"
+        return "png"
+
+    def _local_path(self, image_url: str) -> Optional[Path]:
+        """Ruta local de una URL bajo /static/, si existe"""
+        relative = self._relative_path(image_url)
+        if relative is None:
+            return None
+        local = self.static_dir / relative
+        if relative in self.manifest:
+            return local
+        return local if local.is_file() else None
+
+    def _public_url(self, image_url: str, filename: str) -> str:
+        """URL pública de un derivado, con el mismo origen que la original"""
+        origin = image_url[:image_url.index("/static/")]
+        return f"{origin}/static/{self.cache_subdir}/{filename}"
+
+    def _source_digest(self, source: Path) -> str:
+        """Hash del contenido original (del manifest o memoizado por ruta y mtime)"""
+        info = self.manifest.get(source.relative_to(self.static_dir).as_posix())
+        if info is not None:
+            return info["hash"]
+
+        key = (str(source), source.stat().st_mtime_ns)
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = hashlib.sha256(source.read_bytes()).hexdigest()
+            self._digests[key] = digest
+        return digest
+
+    @staticmethod
+    def can_render(source: Path, fmt: str) -> bool:
+        if source.suffix.lower() == ".svg":
+            return _cairosvg() is not None and (fmt == "png" or _pil_image() is not None)
+        return _pil_image() is not None
+
+    @staticmethod
+    def _render(source: Path, width: int, fmt: str) -> bytes:
+        """Rasteriza/redimensiona la imagen original al ancho indicado"""
+        Image = _pil_image()
+        if source.suffix.lower() == ".svg":
+            png = _cairosvg().svg2png(url=str(source), output_width=width)
+            if fmt == "png":
+                return png
+            image = Image.open(io.BytesIO(png))
+        else:
+            image = Image.open(source)
+            image.thumbnail((width, width))
+
+        output = io.BytesIO()
+        image.save(output, format=fmt.upper())
+        return output.getvalue()
+
+    def derivative_url(self, image_url: str, size: str, fmt: str = "png", generate: bool = True) -> str:
+        """
+        URL del derivado de una imagen.
+
+        Con generate=False solo se devuelven derivados ya existentes, para no
+        renderizar en rutas calientes como los listados.
+        """
+        source = self._local_path(image_url)
+        if source is None or not self.can_render(source, fmt):
+            return image_url
+
+        width = DERIVATIVE_SIZES[size]
+        filename = f"{self._source_digest(source)[:20]}-{width}.{fmt}"
+        target = self.cache_dir / filename
+
+        if not self._has_derivative(filename):
+            if not generate:
+                return image_url
+            if not target.exists():
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_bytes(self._render(source, width, fmt))
+                os.replace(tmp_path, target)
+            self._derivatives.add(filename)
+
+        return self._public_url(image_url, filename)
+
+    def thumbnail_url(self, image_url: str) -> str:
+        """Miniatura ya generada para listados (o la original si no existe)"""
+        if not image_url:
+            return image_url
+        return self.derivative_url(image_url, "thumbnail", "png", generate=False)
+
+    def srcset(self, image_url: str, fmt: str = "png") -> List[Dict]:
+        """Derivados de una imagen en todos los tamaños"""
+        return [
+            {
+                "size": size,
+                "width": width,
+                "url": self.derivative_url(image_url, size, fmt),
+            }
+            for size, width in DERIVATIVE_SIZES.items()
+        ]
+
+    def build_derivatives(self, image_urls: List[str]) -> int:
+        """Genera todos los derivados de una lista de imágenes"""
+        generated = 0
+        for image_url in image_urls:
+            for fmt in CONTENT_TYPES:
+                for entry in self.srcset(image_url, fmt):
+                    generated += entry["url"] != image_url
+        return generated
+
+
+# Instancia global del servicio
+image_service = ImageService()
+
+
+if __name__ == "__main__":
+    import json
+
+    with open("app/data/products.json", 'r', encoding='utf-8') as f:
+        products = json.load(f)["products"]
+
+    urls = [url for product in products for url in product["images"]]
+    print(f"Derivados disponibles: {image_service.build_derivatives(urls)}")
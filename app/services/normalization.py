@@ -0,0 +1,89 @@
+import re
+from typing import Dict, Optional, Tuple
+
+# Atributos numéricos derivados de specifications: etiqueta (en minúsculas)
+# -> (atributo, unidad canónica)
+SPEC_ATTRIBUTES: Dict[str, Tuple[str, str]] = {
+    "memoria ram": ("ram_gb", "GB"),
+    "almacenamiento interno": ("storage_gb", "GB"),
+    "tamaño de pantalla": ("screen_in", "in"),
+    "resolución de la cámara trasera principal": ("camera_mpx", "Mpx"),
+    "resolución de la cámara frontal principal": ("front_camera_mpx", "Mpx"),
+    "capacidad de la batería": ("battery_mah", "mAh"),
+}
+
+# Todos los atributos normalizados de un producto (filtrables y ordenables)
+NORMALIZED_ATTRIBUTES = ("sold_quantity",) + tuple(attribute for attribute, _ in SPEC_ATTRIBUTES.values())
+
+# Factor a la unidad canónica
+UNIT_FACTORS: Dict[str, Tuple[str, float]] = {
+    "kb": ("GB", 1 / (1024 * 1024)),
+    "mb": ("GB", 1 / 1024),
+    "gb": ("GB", 1.0),
+    "tb": ("GB", 1024.0),
+    '"': ("in", 1.0),
+    "''": ("in", 1.0),
+    "in": ("in", 1.0),
+    "pulgadas": ("in", 1.0),
+    "cm": ("in", 1 / 2.54),
+    "mp": ("Mpx", 1.0),
+    "mpx": ("Mpx", 1.0),
+    "mah": ("mAh", 1.0),
+}
+
+_MEASURE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)\s*(.*?)\s*$")
+_QUANTITY = re.compile(r"^\s*(\d[\d.,]*)\s*(k|mil)?\s*\+?\s*$", re.IGNORECASE)
+
+
+def parse_quantity(value) -> Optional[int]:
+    """
+    Cota inferior de una cantidad como "500+", "1.000+" o "5k+".
+
+    Devuelve None si el texto no es una cantidad.
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _QUANTITY.match(str(value or ""))
+    if match is None:
+        return None
+    number = int(re.sub(r"[.,]", "", match.group(1)))
+    if match.group(2):
+        number *= 1000
+    return number
+
+
+def parse_measure(value) -> Optional[Tuple[float, str]]:
+    """
+    Valor y unidad canónica de una medida como "8 GB", '6.6"' o "50 Mpx".
+
+    Devuelve None si no empieza con un número o la unidad no es conocida.
+    """
+    match = _MEASURE.match(str(value or ""))
+    if match is None:
+        return None
+    number = float(match.group(1).replace(",", "."))
+    unit = UNIT_FACTORS.get(match.group(2).lower())
+    if unit is None:
+        return None
+    canonical, factor = unit
+    return number * factor, canonical
+
+
+def normalize_product(product: Dict) -> Dict[str, float]:
+    """Atributos numéricos tipados de un producto (solo los que se pudieron leer)"""
+    attributes: Dict[str, float] = {}
+
+    sold = parse_quantity(product.get("sold_quantity"))
+    if sold is not None:
+        attributes["sold_quantity"] = sold
+
+    for spec in product.get("specifications") or ():
+        target = SPEC_ATTRIBUTES.get(str(spec.get("label", "")).strip().lower())
+        if target is None:
+            continue
+        attribute, unit = target
+        measure = parse_measure(spec.get("value"))
+        if measure is not None and measure[1] == unit:
+            attributes[attribute] = measure[0]
+
+    return attributes
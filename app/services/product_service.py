@@ -1,21 +1,77 @@
 import asyncio
 import json
-from datetime import datetime
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import (Any, AsyncIterator, Dict, Iterable, List, Optional, Set,
+                    Tuple)
 
-from app.models.product import (Product, ProductColor, ProductCreate,
-                                ProductInstallments, ProductResponse,
-                                ProductSpecification, ProductSummary,
-                                ProductUpdate, Seller)
+from app.models.product import (CategorySummary, Product, ProductColor,
+                                ProductCreate, ProductInstallments,
+                                ProductResponse, ProductSpecification,
+                                ProductSummary, ProductUpdate, Seller,
+                                SellerSummary, StockUpdateItem,
+                                StockUpdateResult)
+from app.services.cache import TieredCache, create_cache
+from app.services.catalog_index import AttributeRanges, CatalogIndex
+from app.services.catalog_snapshot import (SNAPSHOT_FILE, load_catalog,
+                                           load_snapshot, write_snapshot)
+from app.services.data_loader import RequestLoaders
+from app.services.image_service import image_service
+from app.services.normalization import parse_quantity
+from app.services.query_cache import QueryCache, QueryResult
+from app.services.task_executor import task_executor
+from app.services.tracing import current_span, span, traced
+from app.services.write_ahead_log import WriteAheadLog
+
+
+# Máximo de productos relacionados en el detalle
+RELATED_LIMIT = 4
+
+# Campos del producto que aparecen en ProductSummary
+SUMMARY_FIELDS = ("title", "price", "currency", "images", "rating",
+                  "reviews_count", "free_shipping", "condition", "seller_id")
+
+# TTL del detalle cacheado y ventana stale-while-revalidate (segundos)
+DETAIL_TTL = 30
+DETAIL_STALE_TTL = 30
+
+# Cada cuánto un worker aplica lo que otros escribieron en el log (segundos)
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL_MS", 1000)) / 1000
+WAL_LOCK_POLL_INTERVAL = 0.005
 
 
 class ProductService:
-    def __init__(self, data_path: str = "app/data"):
+    def __init__(
+        self,
+        data_path: str = "app/data",
+        compact_every: int = 100,
+        cache: Optional[TieredCache] = None,
+        site_id: Optional[str] = None,
+        query_cache: Optional[QueryCache] = None
+    ):
         self.data_path = Path(data_path)
-        self._products_cache = None
+        # None para el sitio por defecto (claves de cache y CDN sin prefijo)
+        self.site_id = site_id
+        self.compact_every = compact_every
+        self._catalog: Optional[CatalogIndex] = None
         self._sellers_cache = None
+        self._sellers_by_id: Optional[Dict[str, Dict]] = None
         self._categories_cache = None
+        self._categories_by_id: Optional[Dict[str, Dict]] = None
+        self._last_product_number = 0
+        self._wal = WriteAheadLog(self.data_path / "products.wal")
+        self._write_lock = asyncio.Lock()
+        self._load_lock = asyncio.Lock()
+        self._base_stamp: Optional[Tuple[int, int, int]] = None
+        self._synced_at = 0.0
+        self._cache = cache or create_cache()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_checked = False
+        self._query_cache = query_cache or QueryCache()
     
     async def _load_json_file(self, filename: str) -> Dict[str, Any]:
         """Carga asíncrona de archivos JSON"""
@@ -25,31 +81,162 @@ class ProductService:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         
-        # Simular operación asíncrona
-        await asyncio.sleep(0.01)  # Simular delay de I/O
-        return read_file()
+        return await task_executor.run_io(read_file)
+    
+    async def _get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Snapshot precompilado del catálogo, si existe y está al día"""
+        if not self._snapshot_checked:
+            self._snapshot = await task_executor.run_io(load_snapshot, self.data_path)
+            self._snapshot_checked = True
+        return self._snapshot
+    
+    async def _get_catalog(self) -> CatalogIndex:
+        """Obtiene el catálogo indexado (snapshot o JSON base + log de escrituras)"""
+        if self._catalog is None:
+            # Una sola carga aunque lleguen varios requests antes de terminarla
+            async with self._load_lock:
+                if self._catalog is None:
+                    await self._lock_wal()
+                    try:
+                        self._catalog = await self._load_catalog()
+                    finally:
+                        self._wal.unlock()
+        elif time.monotonic() - self._synced_at >= CATALOG_SYNC_INTERVAL:
+            await self._sync_if_idle()
+        return self._catalog
+    
+    def _stamp_base(self) -> Optional[Tuple[int, int, int]]:
+        """Identidad del JSON base: la compactación lo reemplaza por un archivo nuevo"""
+        try:
+            stat = (self.data_path / "products.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+    
+    async def _lock_wal(self):
+        """Espera el lock del log (compartido entre workers) sin bloquear el loop"""
+        while not self._wal.try_lock():
+            await asyncio.sleep(WAL_LOCK_POLL_INTERVAL)
+    
+    async def _load_catalog(self) -> CatalogIndex:
+        """Carga completa; se llama con el lock del log tomado"""
+        self._base_stamp = self._stamp_base()
+        self._synced_at = time.monotonic()
+        snapshot = await self._get_snapshot()
+        if snapshot is not None:
+            catalog = snapshot["catalog"]
+            catalog.version = 0
+        else:
+            # Parseo e indexado son CPU: en el pool de procesos
+            catalog = await task_executor.run_cpu(load_catalog, str(self.data_path / "products.json"))
+        for product_id in catalog.products:
+            self._track_product_id(product_id)
+        for entry in await task_executor.run_io(self._wal.replay):
+            self._apply_entry(catalog, entry)
+        return catalog
+    
+    async def _sync(self):
+        """
+        Aplica lo que otros workers escribieron desde la última lectura (con
+        el lock del log tomado). Si alguno compactó, el JSON base ya incluye
+        todo el log anterior y se recarga el catálogo.
+        """
+        catalog = self._catalog
+        if self._stamp_base() != self._base_stamp:
+            self._snapshot = None
+            self._snapshot_checked = False
+            reloaded = await self._load_catalog()
+            # La versión sigue creciendo: invalida el cache de consultas
+            reloaded.version = catalog.version + 1
+            self._catalog = reloaded
+            await self.invalidate_cache()
+            return
+        
+        self._synced_at = time.monotonic()
+        entries = await task_executor.run_io(self._wal.read_new)
+        if entries:
+            await self._apply_entries(catalog, entries)
+    
+    async def _sync_if_idle(self):
+        """Sincroniza desde el camino de lectura si nadie está escribiendo"""
+        if self._write_lock.locked() or not self._wal.try_lock():
+            return
+        try:
+            async with self._write_lock:
+                await self._sync()
+        finally:
+            self._wal.unlock()
+    
+    @asynccontextmanager
+    async def _writing(self) -> AsyncIterator[CatalogIndex]:
+        """
+        Sección de escritura: lock del proceso y del log, con el catálogo al
+        día respecto de los demás workers (IDs y compactación incluidos).
+        """
+        async with self._write_lock:
+            await self._get_catalog()
+            await self._lock_wal()
+            try:
+                await self._sync()
+                yield self._catalog
+            finally:
+                self._wal.unlock()
     
     async def _get_products_data(self) -> List[Dict]:
         """Obtiene datos de productos con cache"""
-        if self._products_cache is None:
-            data = await self._load_json_file("products.json")
-            self._products_cache = data["products"]
-        return self._products_cache
+        catalog = await self._get_catalog()
+        return list(catalog.products.values())
     
     async def _get_sellers_data(self) -> List[Dict]:
         """Obtiene datos de vendedores con cache"""
         if self._sellers_cache is None:
-            data = await self._load_json_file("sellers.json")
-            self._sellers_cache = data["sellers"]
+            snapshot = await self._get_snapshot()
+            if snapshot is not None:
+                self._sellers_cache = snapshot["sellers"]
+            else:
+                data = await self._load_json_file("sellers.json")
+                self._sellers_cache = data["sellers"]
+            for seller in self._sellers_cache:
+                seller["sales_count"] = parse_quantity(seller.get("sales"))
+            self._sellers_by_id = {s["id"]: s for s in self._sellers_cache}
         return self._sellers_cache
     
+    async def _get_seller_data(self, seller_id: str) -> Optional[Dict]:
+        """Obtiene un vendedor por ID"""
+        await self._get_sellers_data()
+        return self._sellers_by_id.get(seller_id)
+    
     async def _get_categories_data(self) -> List[Dict]:
         """Obtiene datos de categorías con cache"""
         if self._categories_cache is None:
-            data = await self._load_json_file("categories.json")
-            self._categories_cache = data["categories"]
+            snapshot = await self._get_snapshot()
+            if snapshot is not None:
+                self._categories_cache = snapshot["categories"]
+            else:
+                data = await self._load_json_file("categories.json")
+                self._categories_cache = data["categories"]
+            self._categories_by_id = {c["id"]: c for c in self._categories_cache}
         return self._categories_cache
     
+    @traced("seller.batch_load")
+    async def _load_sellers(self, seller_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Resuelve un lote de vendedores en una sola llamada (punto de
+        reemplazo para un servicio o base de vendedores externa)
+        """
+        await self._get_sellers_data()
+        return {sid: self._sellers_by_id[sid] for sid in seller_ids if sid in self._sellers_by_id}
+    
+    @traced("category.batch_load")
+    async def _load_categories(self, category_ids: List[str]) -> Dict[str, Dict]:
+        """Resuelve un lote de categorías en una sola llamada"""
+        await self._get_categories_data()
+        return {cid: self._categories_by_id[cid] for cid in category_ids if cid in self._categories_by_id}
+    
+    def create_loaders(self) -> RequestLoaders:
+        """Loaders con batching para un request"""
+        return RequestLoaders(self._load_sellers, self._load_categories)
+    
     def _parse_product(self, product_data: Dict) -> Product:
         """Convierte dict a modelo Product"""
         # Convertir colores
@@ -90,45 +277,143 @@ class ProductService:
             description=product_data["description"],
             features=product_data["features"],
             created_at=datetime.fromisoformat(product_data["created_at"].replace('Z', '+00:00')),
-            updated_at=datetime.fromisoformat(product_data["updated_at"].replace('Z', '+00:00'))
+            updated_at=datetime.fromisoformat(product_data["updated_at"].replace('Z', '+00:00')),
+            version=product_data.get("version", 1)
         )
     
+    def stats(self) -> Dict[str, Any]:
+        """Estado de carga y tamaño de los índices (sin forzar la carga)"""
+        catalog = self._catalog
+        if catalog is None:
+            return {"loaded": False}
+        
+        return {
+            "loaded": True,
+            "version": catalog.version,
+            "products": len(catalog),
+            "categories": len(catalog.by_category),
+            "price_index": len(catalog.by_price),
+            "search_terms": len(catalog.postings),
+            "pending_wal_entries": self._wal.entries,
+            "cache": self._cache.stats(),
+            "query_cache": self._query_cache.stats()
+        }
+    
+    def is_writing(self) -> bool:
+        """Hay una escritura en curso (no se debe descartar la instancia)"""
+        return self._write_lock.locked()
+    
+    async def warm_up(self):
+        """Carga el catálogo y los vendedores antes de recibir tráfico"""
+        await self._get_catalog()
+        await self._get_sellers_data()
+    
+    @staticmethod
+    def _to_summary(p: Dict, seller: Optional[Dict] = None, category: Optional[Dict] = None) -> ProductSummary:
+        """Convierte dict a modelo ProductSummary"""
+        return ProductSummary(
+            id=p["id"],
+            title=p["title"],
+            price=p["price"],
+            currency=p["currency"],
+            image=image_service.thumbnail_url(p["images"][0]) if p["images"] else "",
+            rating=p["rating"],
+            reviews_count=p["reviews_count"],
+            free_shipping=p["free_shipping"],
+            condition=p["condition"],
+            seller=SellerSummary(**seller) if seller else None,
+            category=CategorySummary(**category) if category else None
+        )
+    
+    @traced("product.summaries")
+    async def _summaries(self, products: List[Dict], loaders: Optional[RequestLoaders] = None) -> List[ProductSummary]:
+        """ProductSummary con vendedor y categoría resueltos en lote"""
+        loaders = loaders or self.create_loaders()
+        sellers, categories = await asyncio.gather(
+            loaders.sellers.load_many(p["seller_id"] for p in products),
+            loaders.categories.load_many(p["category_id"] for p in products)
+        )
+        return [
+            self._to_summary(product, seller, category)
+            for product, seller, category in zip(products, sellers, categories)
+        ]
+    
+    @staticmethod
+    def _detail_namespace(category_id: str) -> str:
+        # Un namespace por categoría: invalidar los relacionados de una
+        # categoría es un solo bump de versión
+        return f"detail:{category_id}"
+    
+    @traced("product.get_by_id")
     async def get_product_by_id(self, product_id: str) -> Optional[ProductResponse]:
         """Obtiene un producto por ID con información completa"""
-        products_data = await self._get_products_data()
-        sellers_data = await self._get_sellers_data()
+        catalog = await self._get_catalog()
+        
+        product_data = catalog.get(product_id)
+        if not product_data:
+            return None
+        
+        return await self._cache.get_or_load(
+            self._detail_namespace(product_data["category_id"]),
+            product_id,
+            lambda: self._build_product_detail(product_id),
+            ttl=DETAIL_TTL,
+            stale_ttl=DETAIL_STALE_TTL
+        )
+    
+    async def get_breadcrumb(
+        self, category_id: str, loaders: Optional[RequestLoaders] = None
+    ) -> List[CategorySummary]:
+        """Ruta de categorías desde la raíz hasta `category_id`"""
+        loaders = loaders or self.create_loaders()
+        path: List[CategorySummary] = []
+        seen: Set[str] = set()
+        while category_id and category_id not in seen:
+            seen.add(category_id)
+            category = await loaders.categories.load(category_id)
+            if category is None:
+                break
+            path.append(CategorySummary(**category))
+            category_id = category.get("parent_id")
+        return path[::-1]
+    
+    async def updated_at(self, product_ids: Iterable[str]) -> List[Optional[str]]:
+        """`updated_at` de cada producto (None si no existe)"""
+        catalog = await self._get_catalog()
+        return [
+            catalog.products[pid].get("updated_at") if pid in catalog else None
+            for pid in product_ids
+        ]
+    
+    @traced("product.build_detail")
+    async def _build_product_detail(self, product_id: str) -> Optional[ProductResponse]:
+        """Arma el detalle completo de un producto (sin cache)"""
+        catalog = await self._get_catalog()
         
         # Buscar el producto
-        product_data = next((p for p in products_data if p["id"] == product_id), None)
+        product_data = catalog.get(product_id)
         if not product_data:
             return None
         
         # Convertir a modelo Product
-        product = self._parse_product(product_data)
+        with span("product.parse"):
+            product = self._parse_product(product_data)
         
-        # Buscar información del vendedor
-        seller_data = next((s for s in sellers_data if s["id"] == product.seller_id), None)
-        seller = Seller(**seller_data) if seller_data else None
+        # El vendedor del producto y los de los relacionados se piden en el mismo lote
+        loaders = self.create_loaders()
+        seller_future = loaders.sellers.load(product.seller_id)
         
         # Buscar productos relacionados (misma categoría, excluyendo el actual)
-        related_products_data = [
-            p for p in products_data 
-            if p["category_id"] == product.category_id and p["id"] != product_id
-        ][:4]  # Máximo 4 productos relacionados
-        
-        related_products = [
-            ProductSummary(
-                id=p["id"],
-                title=p["title"],
-                price=p["price"],
-                currency=p["currency"],
-                image=p["images"][0] if p["images"] else "",
-                rating=p["rating"],
-                reviews_count=p["reviews_count"],
-                free_shipping=p["free_shipping"],
-                condition=p["condition"]
-            ) for p in related_products_data
-        ]
+        related_ids = islice(
+            (pid for pid in catalog.by_category.get(product.category_id, ()) if pid != product_id),
+            RELATED_LIMIT
+        )
+        with span("product.related"):
+            related_products = await self._summaries([catalog.products[pid] for pid in related_ids], loaders)
+        
+        with span("seller.load"):
+            seller_data = await seller_future
+        seller = Seller(**seller_data) if seller_data else None
         
         return ProductResponse(
             **product.model_dump(),
@@ -143,47 +428,103 @@ class ProductService:
         category_id: Optional[str] = None,
         search: Optional[str] = None,
         min_price: Optional[float] = None,
-        max_price: Optional[float] = None
+        max_price: Optional[float] = None,
+        free_shipping: Optional[bool] = None,
+        condition: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        ranges: Optional[AttributeRanges] = None,
+        sort: Optional[str] = None,
+        loaders: Optional[RequestLoaders] = None
     ) -> List[ProductSummary]:
         """Obtiene lista de productos con filtros"""
-        products_data = await self._get_products_data()
-        
-        # Aplicar filtros
-        filtered_products = products_data
-        
-        if category_id:
-            filtered_products = [p for p in filtered_products if p["category_id"] == category_id]
-        
-        if search:
-            search_lower = search.lower()
-            filtered_products = [
-                p for p in filtered_products 
-                if search_lower in p["title"].lower() or search_lower in p["description"].lower()
-            ]
-        
-        if min_price is not None:
-            filtered_products = [p for p in filtered_products if p["price"] >= min_price]
+        products, _, _ = await self.find_products(
+            skip, limit, category_id, search, min_price, max_price,
+            free_shipping, condition, min_rating, ranges, sort, loaders
+        )
+        return products
+    
+    @traced("product.find")
+    async def find_products(
+        self, 
+        skip: int = 0, 
+        limit: int = 20,
+        category_id: Optional[str] = None,
+        search: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        free_shipping: Optional[bool] = None,
+        condition: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        ranges: Optional[AttributeRanges] = None,
+        sort: Optional[str] = None,
+        loaders: Optional[RequestLoaders] = None
+    ) -> Tuple[List[ProductSummary], int, Optional[str]]:
+        """
+        Página de productos, total de coincidencias y búsqueda sugerida.
         
-        if max_price is not None:
-            filtered_products = [p for p in filtered_products if p["price"] <= max_price]
+        Si la búsqueda exacta no encuentra nada se repite tolerando errores
+        de tipeo y palabras en otro orden ("samsumg galxy a55"); la sugerencia
+        es la búsqueda corregida, o None si no hubo nada que corregir.
+        Los IDs de la página y el total se memorizan por combinación de
+        filtros hasta la próxima escritura en el catálogo.
+        """
+        catalog = await self._get_catalog()
         
-        # Paginación
-        paginated_products = filtered_products[skip:skip + limit]
+        # La búsqueda no distingue mayúsculas, así que la clave tampoco
+        key = (
+            category_id, search.lower() if search else None, min_price, max_price,
+            free_shipping, condition, min_rating, tuple(sorted((ranges or {}).items())),
+            sort, skip, limit
+        )
+        result = self._query_cache.get(key, catalog.version)
+        active = current_span()
+        if active is not None:
+            active.set("query_cache", "hit" if result is not None else "miss")
+        if result is None:
+            with span("catalog.query"):
+                result = self._query(catalog, category_id, search, min_price, max_price,
+                                     free_shipping, condition, min_rating, ranges, sort, skip, limit)
+            self._query_cache.set(key, catalog.version, result)
         
-        # Convertir a ProductSummary
-        return [
-            ProductSummary(
-                id=p["id"],
-                title=p["title"],
-                price=p["price"],
-                currency=p["currency"],
-                image=p["images"][0] if p["images"] else "",
-                rating=p["rating"],
-                reviews_count=p["reviews_count"],
-                free_shipping=p["free_shipping"],
-                condition=p["condition"]
-            ) for p in paginated_products
-        ]
+        # Convertir a ProductSummary (vendedores y categorías en lote)
+        products = await self._summaries([catalog.products[pid] for pid in result.ids], loaders)
+        return products, result.total, result.suggestion
+    
+    @staticmethod
+    def _query(
+        catalog: CatalogIndex,
+        category_id: Optional[str],
+        search: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        free_shipping: Optional[bool],
+        condition: Optional[str],
+        min_rating: Optional[float],
+        ranges: Optional[AttributeRanges],
+        sort: Optional[str],
+        skip: int,
+        limit: int
+    ) -> QueryResult:
+        """Filtros, orden y paginación sobre los índices (con reintento tolerante a errores)"""
+        filters = dict(
+            category_id=category_id,
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            free_shipping=free_shipping,
+            condition=condition,
+            min_rating=min_rating,
+            ranges=ranges,
+            sort=sort,
+            skip=skip,
+            limit=limit
+        )
+        paginated_ids, total = catalog.query_page(**filters)
+        suggestion = None
+        if search and total == 0:
+            paginated_ids, total = catalog.query_page(**filters, fuzzy=True)
+            suggestion = catalog.suggest(search)
+        return QueryResult(tuple(paginated_ids), total, suggestion)
     
     async def search_products(self, query: str, limit: int = 10) -> List[ProductSummary]:
         """Búsqueda de productos por texto"""
@@ -192,6 +533,257 @@ class ProductService:
     async def get_products_by_category(self, category_id: str, limit: int = 20) -> List[ProductSummary]:
         """Obtiene productos por categoría"""
         return await self.get_products(limit=limit, category_id=category_id)
+    
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _now_iso() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    
+    def _track_product_id(self, product_id: str):
+        """Registra el mayor número de ID visto para generar los siguientes"""
+        if product_id.startswith("MLA") and product_id[3:].isdigit():
+            self._last_product_number = max(self._last_product_number, int(product_id[3:]))
+    
+    def _next_product_id(self) -> str:
+        self._last_product_number += 1
+        return f"MLA{self._last_product_number}"
+    
+    def _apply_entry(self, catalog: CatalogIndex, entry: Dict[str, Any]):
+        """Aplica una entrada del log sobre los índices en memoria"""
+        if entry["op"] == "upsert":
+            catalog.upsert(entry["product"])
+            self._track_product_id(entry["product"]["id"])
+        elif entry["op"] == "delete":
+            catalog.remove(entry["id"])
+    
+    def _affected_details(
+        self, catalog: CatalogIndex, entries: Iterable[Dict[str, Any]]
+    ) -> Tuple[Set[str], Dict[str, Set[str]]]:
+        """
+        Calcula qué detalles cacheados quedan desactualizados por las entradas.
+        
+        Devuelve las categorías a invalidar completas y, por namespace, las
+        claves puntuales. Un producto aparece como relacionado de otro de su
+        categoría solo si está entre los primeros RELATED_LIMIT + 1, así que el
+        resto de los cambios afectan únicamente a su propio detalle.
+        """
+        categories: Set[str] = set()
+        keys: Dict[str, Set[str]] = {}
+        
+        for entry in entries:
+            product_id = entry["product"]["id"] if entry["op"] == "upsert" else entry["id"]
+            previous = catalog.get(product_id)
+            current = entry.get("product")
+            
+            # Alta, baja o cambio de categoría: cambian los relacionados de la categoría
+            if previous is None or current is None or previous["category_id"] != current["category_id"]:
+                categories.update(p["category_id"] for p in (previous, current) if p is not None)
+                continue
+            
+            category_id = current["category_id"]
+            namespace = self._detail_namespace(category_id)
+            keys.setdefault(namespace, set()).add(product_id)
+            
+            if all(previous.get(field) == current.get(field) for field in SUMMARY_FIELDS):
+                continue
+            
+            head = list(islice(catalog.by_category.get(category_id, ()), RELATED_LIMIT + 1))
+            if product_id in head[:RELATED_LIMIT]:
+                # Es relacionado de todos los demás productos de la categoría
+                categories.add(category_id)
+            elif len(head) > RELATED_LIMIT and head[RELATED_LIMIT] == product_id:
+                keys[namespace].update(head[:RELATED_LIMIT])
+        
+        return categories, keys
+    
+    async def _invalidate_details(self, categories: Set[str], keys: Dict[str, Set[str]]):
+        """Invalida en ambos niveles del cache los detalles afectados"""
+        for category_id in categories:
+            await self._cache.bump(self._detail_namespace(category_id))
+        for namespace, product_ids in keys.items():
+            await self._cache.delete(namespace, *product_ids)
+    
+    async def _commit(self, catalog: CatalogIndex, entry: Dict[str, Any]):
+        """Persiste la entrada en el log, la aplica y compacta si corresponde"""
+        await self._commit_many(catalog, [entry])
+    
+    async def _commit_many(self, catalog: CatalogIndex, entries: List[Dict[str, Any]]):
+        """Persiste un lote de entradas con una sola escritura y las aplica"""
+        self._wal.append_many(entries)
+        categories, keys = self._affected_details(catalog, entries)
+        for entry in entries:
+            self._apply_entry(catalog, entry)
+        await self._invalidate_details(categories, keys)
+        
+        if self._wal.entries >= self.compact_every:
+            await self._compact(catalog)
+    
+    async def _compact(self, catalog: CatalogIndex):
+        """Vuelca el catálogo al JSON base y, si se usa, regenera el snapshot"""
+        # Con el lock de escritura tomado nadie modifica el catálogo mientras
+        # se serializa en el pool
+        await task_executor.run_io(
+            self._wal.compact, self.data_path / "products.json", list(catalog.products.values())
+        )
+        
+        if (self.data_path / SNAPSHOT_FILE).exists():
+            await task_executor.run_io(
+                write_snapshot,
+                self.data_path,
+                catalog,
+                await self._get_sellers_data(),
+                await self._get_categories_data()
+            )
+    
+    async def invalidate_cache(self):
+        """Invalida todos los detalles cacheados (p.ej. tras reemplazar los JSON)"""
+        catalog = await self._get_catalog()
+        for category_id in catalog.by_category:
+            await self._cache.bump(self._detail_namespace(category_id))
+    
+    async def compact(self):
+        """Fuerza la compactación del log de escrituras"""
+        async with self._write_lock:
+            catalog = await self._get_catalog()
+            await self._compact(catalog)
+    
+    async def _validate_references(self, category_id: str, seller_id: str):
+        """Valida que la categoría y el vendedor existan"""
+        categories = await self._get_categories_data()
+        if not any(c["id"] == category_id for c in categories):
+            raise ValueError(f"Categoría '{category_id}' no existe")
+        
+        if await self._get_seller_data(seller_id) is None:
+            raise ValueError(f"Vendedor '{seller_id}' no existe")
+    
+    async def create_product(self, product_in: ProductCreate) -> ProductResponse:
+        """Crea un producto nuevo"""
+        async with self._write_lock:
+            catalog = await self._get_catalog()
+            await self._validate_references(product_in.category_id, product_in.seller_id)
+            
+            now = self._now_iso()
+            product_data = {
+                "id": self._next_product_id(),
+                "original_price": None,
+                "sold_quantity": "0",
+                "rating": 0.0,
+                "reviews_count": 0,
+                "free_shipping": False,
+                "full_warranty": False,
+                "mercado_pago": True,
+                "payment_methods": [],
+                "installments": {"available": False, "count": 1, "interest": "sin interés"},
+                **product_in.model_dump(),
+                "created_at": now,
+                "updated_at": now,
+                "version": 1
+            }
+            await self._commit(catalog, {"op": "upsert", "product": product_data})
+        
+        return await self.get_product_by_id(product_data["id"])
+    
+    async def replace_product(self, product_id: str, product_in: ProductCreate) -> Optional[ProductResponse]:
+        """Reemplaza los datos editables de un producto (PUT)"""
+        async with self._write_lock:
+            catalog = await self._get_catalog()
+            existing = catalog.get(product_id)
+            if existing is None:
+                return None
+            await self._validate_references(product_in.category_id, product_in.seller_id)
+            
+            product_data = {
+                **existing,
+                **product_in.model_dump(),
+                "updated_at": self._now_iso(),
+                "version": existing.get("version", 1) + 1
+            }
+            await self._commit(catalog, {"op": "upsert", "product": product_data})
+        
+        return await self.get_product_by_id(product_id)
+    
+    async def update_product(self, product_id: str, product_in: ProductUpdate) -> Optional[ProductResponse]:
+        """Actualiza parcialmente un producto (PATCH)"""
+        async with self._write_lock:
+            catalog = await self._get_catalog()
+            existing = catalog.get(product_id)
+            if existing is None:
+                return None
+            
+            product_data = {
+                **existing,
+                **product_in.model_dump(exclude_none=True),
+                "updated_at": self._now_iso(),
+                "version": existing.get("version", 1) + 1
+            }
+            await self._commit(catalog, {"op": "upsert", "product": product_data})
+        
+        return await self.get_product_by_id(product_id)
+    
+    async def delete_product(self, product_id: str) -> bool:
+        """Elimina un producto"""
+        async with self._write_lock:
+            catalog = await self._get_catalog()
+            if product_id not in catalog:
+                return False
+            
+            await self._commit(catalog, {"op": "delete", "id": product_id})
+        
+        return True
+    
+    async def bulk_update_stock(self, items: List[StockUpdateItem]) -> List[StockUpdateResult]:
+        """
+        Aplica un lote de cambios de stock/precio en una sola pasada.
+        
+        Cada ítem puede traer la versión que conoce el cliente; si no coincide
+        con la actual se rechaza como conflicto (concurrencia optimista). Los
+        ítems válidos se persisten juntos con una única escritura al log.
+        """
+        results: List[StockUpdateResult] = []
+        
+        async with self._write_lock:
+            catalog = await self._get_catalog()
+            now = self._now_iso()
+            pending: Dict[str, Dict] = {}
+            
+            for item in items:
+                current = pending.get(item.id) or catalog.get(item.id)
+                if current is None:
+                    results.append(StockUpdateResult(
+                        id=item.id, status="not_found", message="Producto no encontrado"
+                    ))
+                    continue
+                
+                current_version = current.get("version", 1)
+                if item.version is not None and item.version != current_version:
+                    results.append(StockUpdateResult(
+                        id=item.id, status="conflict", version=current_version,
+                        message=f"Versión {item.version} desactualizada"
+                    ))
+                    continue
+                
+                if item.stock is None and item.price is None:
+                    results.append(StockUpdateResult(
+                        id=item.id, status="invalid", version=current_version,
+                        message="Se requiere stock o price"
+                    ))
+                    continue
+                
+                updated = {**current, "updated_at": now, "version": current_version + 1}
+                if item.stock is not None:
+                    updated["stock"] = item.stock
+                if item.price is not None:
+                    updated["price"] = item.price
+                
+                pending[item.id] = updated
+                results.append(StockUpdateResult(id=item.id, status="updated", version=updated["version"]))
+            
+            await self._commit_many(catalog, [{"op": "upsert", "product": p} for p in pending.values()])
+        
+        return results
 
 # Instancia global del servicio
 product_service = ProductService()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+# Configuración (variables de entorno); 0 desactiva el cache
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+QUERY_CACHE_TRACKED_KEYS = int(os.getenv("QUERY_CACHE_TRACKED_KEYS", 1024))
+
+
+class QueryResult(NamedTuple):
+    """Resultado de un listado: IDs de la página en orden, total y búsqueda sugerida"""
+    ids: Tuple[str, ...]
+    total: int
+    suggestion: Optional[str] = None
+
+    def size(self) -> int:
+        # Estimación: tupla + un str corto por ID y la clave
+        return 256 + sum(64 + len(product_id) for product_id in self.ids)
+
+
+class QueryCache:
+    """
+    Resultados de listados y búsquedas por combinación de filtros.
+
+    Guarda los IDs ordenados de la página y el total, no los modelos: los
+    productos se arman al responder y siempre reflejan el catálogo actual.
+    Cada entrada vale para una versión del catálogo; con la primera consulta
+    sobre una versión nueva se descarta todo. Es un LRU acotado por bytes.
+
+    Los aciertos y fallos por clave se cuentan aparte (también para claves
+    que ya no están en el cache) en un LRU de `tracked_keys` claves, para
+    dimensionarlo.
+    """
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES, tracked_keys: int = QUERY_CACHE_TRACKED_KEYS):
+        self.max_bytes = max_bytes
+        self.tracked_keys = tracked_keys
+        self.current_bytes = 0
+        self.version: Optional[int] = None
+        self._entries: "OrderedDict[Hashable, Tuple[QueryResult, int]]" = OrderedDict()
+        self._key_stats: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _check_version(self, version: int):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+
+    def _track(self, key: Hashable, hit: bool):
+        counters = self._key_stats.get(key)
+        if counters is None:
+            counters = self._key_stats[key] = [0, 0]
+            if len(self._key_stats) > self.tracked_keys:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(key)
+        counters[0 if hit else 1] += 1
+
+    def get(self, key: Hashable, version: int) -> Optional[QueryResult]:
+        """Resultado de la consulta para esa versión del catálogo, o None"""
+        if not self.enabled:
+            return None
+        self._check_version(version)
+        item = self._entries.get(key)
+        self._track(key, item is not None)
+        if item is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def set(self, key: Hashable, version: int, result: QueryResult):
+        if not self.enabled:
+            return
+        self._check_version(version)
+        size = result.size()
+        if size > self.max_bytes:
+            return
+        self._delete(key)
+        self._entries[key] = (result, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def _delete(self, key: Hashable):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.current_bytes -= item[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """Totales y las `top` claves más pedidas con su tasa de aciertos"""
+        requests = self.hits + self.misses
+        busiest = sorted(self._key_stats.items(), key=lambda item: (-sum(item[1]), -item[1][0]))[:top]
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "top_keys": [
+                {
+                    "key": repr(key),
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3),
+                    "cached": key in self._entries,
+                }
+                for key, (hits, misses) in busiest
+            ],
+        }
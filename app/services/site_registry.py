@@ -0,0 +1,122 @@
+import logging
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.cache import create_cache
+from app.services.product_service import ProductService, product_service
+
+logger = logging.getLogger(__name__)
+
+# Configuración (variables de entorno)
+DEFAULT_SITE = os.getenv("DEFAULT_SITE", "MLA")
+SITE_CACHE_SIZE = int(os.getenv("SITE_CACHE_SIZE", 4))
+SITE_MAX_PRODUCTS = int(os.getenv("SITE_MAX_PRODUCTS", 0))
+
+SITE_ID = re.compile(r"^[A-Za-z0-9_-]{1,16}$")
+
+
+class SiteRegistry:
+    """
+    Catálogos por sitio (país/moneda) cargados bajo demanda.
+
+    El sitio por defecto usa `app/data` y el servicio global, que nunca se
+    descarga. Cada sitio adicional vive en `<base>/sites/<SITE>/` con sus
+    propios JSON, log de escrituras y snapshot, y se carga en un
+    ProductService propio la primera vez que se pide. Los sitios cargados
+    forman un LRU acotado en cantidad (`max_sites`) y, opcionalmente, en
+    productos en memoria (`max_products`); el menos usado se descarga.
+    """
+
+    def __init__(
+        self,
+        base_path: str = "app/data",
+        default_site: str = DEFAULT_SITE,
+        default_service: Optional[ProductService] = None,
+        max_sites: int = SITE_CACHE_SIZE,
+        max_products: int = SITE_MAX_PRODUCTS
+    ):
+        self.base_path = Path(base_path)
+        self.default_site = default_site
+        self.default_service = default_service
+        self.max_sites = max_sites
+        self.max_products = max_products
+        self._services: "OrderedDict[str, ProductService]" = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def site_path(self, site_id: str) -> Path:
+        return self.base_path / "sites" / site_id
+
+    def available(self) -> List[str]:
+        """Sitios configurados (el de por defecto más los directorios de sites/)"""
+        sites_dir = self.base_path / "sites"
+        extra = sorted(
+            entry.name for entry in sites_dir.iterdir()
+            if entry.is_dir() and SITE_ID.match(entry.name)
+        ) if sites_dir.is_dir() else []
+        return [self.default_site] + [site for site in extra if site != self.default_site]
+
+    def exists(self, site_id: str) -> bool:
+        if site_id == self.default_site:
+            return True
+        return bool(SITE_ID.match(site_id)) and (self.site_path(site_id) / "products.json").is_file()
+
+    def get(self, site_id: Optional[str] = None) -> ProductService:
+        """ProductService del sitio (KeyError si el sitio no existe)"""
+        if site_id is None or site_id == self.default_site:
+            return self.default_service or product_service
+
+        service = self._services.get(site_id)
+        if service is not None:
+            self._services.move_to_end(site_id)
+            # Los catálogos crecen al cargarse: el límite de productos se revisa en cada uso
+            self._evict(keep=site_id)
+            return service
+
+        if not self.exists(site_id):
+            raise KeyError(site_id)
+
+        service = ProductService(
+            data_path=str(self.site_path(site_id)),
+            cache=create_cache(prefix=f"meli:{site_id}"),
+            site_id=site_id
+        )
+        self._services[site_id] = service
+        self.loads += 1
+        logger.info(f"Sitio {site_id} registrado (carga diferida)")
+        self._evict(keep=site_id)
+        return service
+
+    def _loaded_products(self) -> int:
+        return sum(service.stats().get("products", 0) for service in self._services.values())
+
+    def _evict(self, keep: str):
+        """Descarga sitios fríos hasta volver a los límites"""
+        for site_id in list(self._services):
+            over_sites = len(self._services) > self.max_sites
+            over_products = self.max_products > 0 and self._loaded_products() > self.max_products
+            if not (over_sites or over_products):
+                break
+            if site_id == keep or self._services[site_id].is_writing():
+                continue
+            del self._services[site_id]
+            self.evictions += 1
+            logger.info(f"Sitio {site_id} descargado de memoria")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.default_site,
+            "loaded": list(self._services),
+            "max_sites": self.max_sites,
+            "max_products": self.max_products,
+            "loaded_products": self._loaded_products(),
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+# Instancia global del registro de sitios
+site_registry = SiteRegistry()
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuración (variables de entorno)
+IO_WORKERS = int(os.getenv("EXECUTOR_IO_WORKERS", 8))
+IO_QUEUE_SIZE = int(os.getenv("EXECUTOR_IO_QUEUE_SIZE", 256))
+# 0 corre el trabajo CPU en el pool de threads (sin procesos)
+CPU_WORKERS = int(os.getenv("EXECUTOR_CPU_WORKERS", min(4, os.cpu_count() or 1)))
+CPU_QUEUE_SIZE = int(os.getenv("EXECUTOR_CPU_QUEUE_SIZE", 64))
+DISCONNECT_POLL_INTERVAL = float(os.getenv("EXECUTOR_DISCONNECT_POLL_MS", 100)) / 1000
+
+
+class ExecutorBusy(Exception):
+    """La cola del pool está llena: el trabajo no se encoló"""
+
+
+class ClientDisconnected(Exception):
+    """El cliente se desconectó antes de que terminara el trabajo"""
+
+
+def _timed(fn: Callable, args: Tuple) -> Tuple[Any, float]:
+    """Corre en el worker: resultado y tiempo de ejecución (sin la espera en cola)"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class WorkerPool:
+    """
+    Pool de threads o de procesos con cola acotada y métricas.
+
+    Acepta hasta `max_workers + max_queue` trabajos pendientes (corriendo o
+    en cola); más allá rechaza con ExecutorBusy en lugar de acumular
+    latencia. Un trabajo que todavía no empezó se descarta si quien lo
+    espera se cancela o su cliente se desconecta; uno que ya está corriendo
+    termina y su resultado se descarta (threads y procesos no se interrumpen).
+
+    Los procesos usan el método de arranque por defecto de la plataforma
+    (fork en Linux, como en create_simple_images): no reimportan el módulo
+    principal. Funciones, argumentos y resultados viajan con pickle.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de pool desconocido: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.run_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        # Se crea con el primer trabajo: importar el módulo no lanza workers
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-worker"
+                )
+        return self._executor
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        # El future concurrente termina en el worker: el contador se toca en el loop
+        try:
+            loop.call_soon_threadsafe(self._finish)
+        except RuntimeError:  # loop cerrado
+            self._finish()
+
+    def _finish(self):
+        self.pending -= 1
+
+    async def run(self, fn: Callable, *args: Any, request: Any = None) -> Any:
+        """
+        Corre `fn(*args)` en el pool y espera el resultado.
+
+        Con `request` (un Request de Starlette) se vigila la conexión: si el
+        cliente se va, el trabajo se cancela y se lanza ClientDisconnected.
+        """
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise ExecutorBusy(f"Pool '{self.name}' lleno: {self.pending} trabajos pendientes")
+
+        loop = asyncio.get_running_loop()
+        concurrent_future = self._get_executor().submit(_timed, fn, args)
+        self.pending += 1
+        self.submitted += 1
+        concurrent_future.add_done_callback(lambda _: self._release(loop))
+        submitted_at = time.perf_counter()
+
+        future = asyncio.wrap_future(concurrent_future)
+        watcher = asyncio.ensure_future(self._watch(request, future)) if request is not None else None
+        try:
+            result, run_seconds = await future
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            if watcher is not None and watcher.done() and not watcher.cancelled() and watcher.result():
+                raise ClientDisconnected(f"Cliente desconectado durante un trabajo de '{self.name}'")
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+        self.completed += 1
+        wait_seconds = max(0.0, time.perf_counter() - submitted_at - run_seconds)
+        self.run_seconds += run_seconds
+        self.wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        return result
+
+    @staticmethod
+    async def _watch(request: Any, future: asyncio.Future) -> bool:
+        """Cancela `future` si el cliente se desconecta; True si lo hizo"""
+        while not future.done():
+            if await request.is_disconnected():
+                future.cancel()
+                return True
+            await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+        return False
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else None,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 3) if self.completed else None,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+class TaskExecutor:
+    """
+    Trabajo bloqueante fuera del event loop.
+
+    - `run_io`: pool de threads para I/O de archivos y librerías que liberan
+      el GIL (lecturas, fsync, derivados de imágenes).
+    - `run_cpu`: pool de procesos para trabajo CPU en Python puro (parseo e
+      indexado del catálogo), que en un thread seguiría frenando al loop.
+    """
+
+    def __init__(
+        self,
+        io_workers: int = IO_WORKERS,
+        io_queue: int = IO_QUEUE_SIZE,
+        cpu_workers: int = CPU_WORKERS,
+        cpu_queue: int = CPU_QUEUE_SIZE
+    ):
+        self.io = WorkerPool("io", "thread", io_workers, io_queue)
+        self.cpu = WorkerPool("cpu", "process", cpu_workers, cpu_queue) if cpu_workers > 0 else self.io
+
+    async def run_io(self, fn: Callable, *args: Any, request: Any = None) -> Any:
+        return await self.io.run(fn, *args, request=request)
+
+    async def run_cpu(self, fn: Callable, *args: Any, request: Any = None) -> Any:
+        return await self.cpu.run(fn, *args, request=request)
+
+    def shutdown(self, wait: bool = True):
+        """Cierra los pools (se vuelven a crear con el próximo trabajo)"""
+        self.io.shutdown(wait)
+        if self.cpu is not self.io:
+            self.cpu.shutdown(wait)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {"io": self.io.stats(), "cpu": self.cpu.stats()}
+
+
+# Instancia global del executor
+task_executor = TaskExecutor()
@@ -0,0 +1,254 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Configuración (variables de entorno)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "True").lower() == "true"
+# none | stdout | file
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "logs/traces.jsonl")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 1.0))
+SERVICE_NAME = os.getenv("SERVICE_NAME", "meli-clone-back")
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Span activo del contexto (request/task) actual
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """Una etapa medida con perf_counter_ns dentro de una traza"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start_unix_ns", "_start_ns", "duration_ns", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: int = 1,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_unix_ns = time.time_ns()
+        self._start_ns = time.perf_counter_ns()
+        self.duration_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        self.duration_ns = time.perf_counter_ns() - self._start_ns
+        self.trace.spans.append(self)
+
+
+class Trace:
+    """Spans terminados de un request (los hijos terminan antes que la raíz)"""
+
+    def __init__(self, trace_id: Optional[str] = None, parent_id: Optional[str] = None):
+        self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+        self.remote_parent_id = parent_id
+        self.spans: List[Span] = []
+
+    def server_timing(self, root: Span) -> str:
+        """Header Server-Timing: total y tiempo acumulado por etapa, en ms"""
+        stages: Dict[str, int] = {}
+        for span in self.spans:
+            if span is not root:
+                stages[span.name] = stages.get(span.name, 0) + span.duration_ns
+        entries = [f"total;dur={root.duration_ns / 1e6:.3f}"]
+        entries += [f"{name};dur={duration / 1e6:.3f}" for name, duration in stages.items()]
+        return ", ".join(entries)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """Span raíz (de tipo servidor) de un request; continúa un `traceparent` W3C válido"""
+    match = TRACEPARENT.match(traceparent or "")
+    trace = Trace(*match.groups()) if match else Trace()
+    root = Span(trace, name, trace.remote_parent_id, kind=2, attributes=attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.error = str(e)
+        raise
+    finally:
+        root.end()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Mide una etapa como hija del span activo. Fuera de un request trazado
+    no hace nada (un ContextVar.get de costo).
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes=attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = str(e)
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+
+def traced(name: str) -> Callable:
+    """Decorador: cada llamada (sync o async) es un span `name`"""
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """Traza en la codificación JSON de OTLP (ExportTraceServiceRequest)"""
+    spans = []
+    for span_ in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": span_.span_id,
+            "name": span_.name,
+            "kind": span_.kind,
+            "startTimeUnixNano": str(span_.start_unix_ns),
+            "endTimeUnixNano": str(span_.start_unix_ns + span_.duration_ns),
+            "attributes": [_attribute(key, value) for key, value in span_.attributes.items()],
+            "status": {"code": 2, "message": span_.error} if span_.error else {"code": 1},
+        }
+        if span_.parent_id:
+            otlp_span["parentSpanId"] = span_.parent_id
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+class OTLPJsonExporter:
+    """
+    Exporta cada traza como una línea OTLP/JSON (el formato del file exporter
+    del OpenTelemetry Collector, que también puede reenviarlas).
+
+    La serialización y la escritura corren en un thread propio; con la cola
+    llena las trazas se descartan y se cuentan, nunca se frena un request.
+    """
+
+    def __init__(self, open_stream: Callable[[], TextIO], max_queue: int = 1024):
+        self.open_stream = open_stream
+        self.exported = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Espera a que se escriban las trazas encoladas"""
+        self._queue.join()
+
+    def _run(self):
+        stream = self.open_stream()
+        while True:
+            trace = self._queue.get()
+            try:
+                stream.write(json.dumps(to_otlp(trace), ensure_ascii=False) + "\n")
+                stream.flush()
+                self.exported += 1
+            except Exception as e:
+                logger.warning(f"No se pudo exportar la traza {trace.trace_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, int]:
+        return {"exported": self.exported, "dropped": self.dropped, "queued": self._queue.qsize()}
+
+
+def create_exporter(kind: str = TRACING_EXPORTER, path: str = TRACING_FILE) -> Optional[OTLPJsonExporter]:
+    if kind == "stdout":
+        return OTLPJsonExporter(lambda: sys.stdout)
+    if kind == "file":
+        return OTLPJsonExporter(lambda: open(path, "a", encoding="utf-8"))
+    if kind != "none":
+        logger.warning(f"TRACING_EXPORTER desconocido: {kind}; no se exportan trazas")
+    return None
+
+
+# Exportador global (None: solo header Server-Timing)
+exporter = create_exporter()
+
+
+def export(trace: Trace):
+    if exporter is not None and (TRACING_SAMPLE_RATE >= 1 or random.random() < TRACING_SAMPLE_RATE):
+        exporter.export(trace)
+
+
+def tracing_stats() -> Dict[str, Any]:
+    return {
+        "enabled": TRACING_ENABLED,
+        "exporter": TRACING_EXPORTER if exporter is not None else "none",
+        **(exporter.stats() if exporter is not None else {}),
+    }
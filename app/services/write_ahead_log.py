@@ -0,0 +1,118 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos (un solo worker)
+    fcntl = None
+
+
+class WriteAheadLog:
+    """
+    Log de escrituras append-only en formato JSON Lines.
+
+    Cada mutación del catálogo se agrega como una línea antes de aplicarse en
+    memoria. Al compactar, el estado completo se vuelca al JSON base y el log
+    se trunca.
+
+    Varios workers comparten el archivo: las escrituras y la compactación se
+    hacen con el lock de archivo (`<log>.lock`) tomado, y cada instancia
+    recuerda hasta qué byte leyó (`offset`) para aplicar solo lo nuevo.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.entries = 0
+        self.offset = 0
+        self._lock_fd: Optional[int] = None
+
+    def try_lock(self) -> bool:
+        """Toma el lock exclusivo sin bloquear; False si lo tiene otro"""
+        if self._lock_fd is not None:
+            raise RuntimeError(f"El lock de {self.path} ya está tomado por esta instancia")
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._lock_fd = fd
+        return True
+
+    def unlock(self):
+        if self._lock_fd is not None:
+            # Cerrar el descriptor libera el flock
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def append_many(self, entries: List[Dict[str, Any]]):
+        """
+        Agrega un lote de entradas con una sola escritura a disco.
+
+        Se llama con el lock tomado y el log ya leído hasta el final: el
+        offset queda al final de lo escrito. Hace fsync (bloqueante).
+        """
+        if not entries:
+            return
+
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.offset += len(data)
+        self.entries += len(entries)
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """Todas las entradas existentes en orden de escritura"""
+        self.entries = 0
+        self.offset = 0
+        return self.read_new()
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        """
+        Entradas agregadas desde el último offset leído (p.ej. por otros
+        workers). Una línea sin terminar es una escritura en curso o
+        interrumpida: se deja para la próxima lectura.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Línea corrupta: se saltea sin perder las siguientes
+                continue
+        self.offset += end
+        self.entries += len(entries)
+        return entries
+
+    def compact(self, snapshot_path: Path, products: List[Dict]):
+        """Vuelca el catálogo completo al JSON base y trunca el log (con el lock tomado)"""
+        snapshot_path = Path(snapshot_path)
+        tmp_path = snapshot_path.with_suffix(snapshot_path.suffix + ".tmp")
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"products": products}, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+
+        if self.path.exists():
+            self.path.unlink()
+        self.entries = 0
+        self.offset = 0
@@ -1,9 +1,12 @@
 import asyncio
+import shutil
+from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.services.product_service import ProductService
 
 
 @pytest.fixture(scope="session")
@@ -19,6 +22,20 @@ def client():
     with TestClient(app) as test_client:
         yield test_client
 
+@pytest.fixture
+def data_path(tmp_path):
+    """Copia de app/data para tests que escriben en el catálogo"""
+    target = tmp_path / "data"
+    shutil.copytree(Path("app/data"), target)
+    return target
+
+@pytest.fixture
+def writable_service(data_path, monkeypatch):
+    """ProductService sobre datos temporales, inyectado en el router"""
+    service = ProductService(data_path=str(data_path))
+    monkeypatch.setattr("app.routers.products.product_service", service)
+    return service
+
 @pytest.fixture
 def sample_product_data():
     """Sample product data for testing"""
@@ -1,7 +1,21 @@
+import asyncio
+import json
+import marshal
+import shutil
+
+import httpx
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.middleware.profiling import profiling_middleware
+from app.middleware.rate_limit import (AdmissionController, RateLimiter,
+                                       admission_middleware,
+                                       rate_limit_middleware)
+from app.routers import debug, products
+from app.services.coalescer import RequestCoalescer
+from app.services.site_registry import SiteRegistry
 
 
 class TestProducts:
@@ -17,6 +31,25 @@ class TestProducts:
         assert "checks" in data
         assert "version" in data
     
+    def test_liveness(self, client):
+        """Test del liveness probe"""
+        response = client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+    
+    def test_readiness(self, client):
+        """Test del readiness probe con estado del catálogo"""
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["status"] == "ready"
+        catalog = data["checks"]["catalog"]
+        assert catalog["loaded"] is True
+        assert catalog["products"] >= 4
+        assert "version" in catalog
+        assert data["checks"]["images_available"] >= 13
+    
     def test_root_endpoint(self, client):
         """Test del endpoint raíz"""
         response = client.get("/")
@@ -39,6 +72,35 @@ class TestProducts:
         assert "seller" in data
         assert "related_products" in data
     
+    def test_get_product_cache_headers(self, client):
+        """Test Last-Modified, If-Modified-Since y Surrogate-Key en el detalle"""
+        response = client.get("/api/products/MLA123456789")
+        assert "s-maxage" in response.headers["Cache-Control"]
+        keys = response.headers["Surrogate-Key"].split()
+        assert {"product:MLA123456789", "category:smartphones", "seller:SELLER001"} <= set(keys)
+        assert "product:MLA123456790" in keys  # relacionado
+        
+        last_modified = response.headers["Last-Modified"]
+        cached = client.get("/api/products/MLA123456789", headers={"If-Modified-Since": last_modified})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["Surrogate-Key"] == response.headers["Surrogate-Key"]
+        
+        old = client.get(
+            "/api/products/MLA123456789",
+            headers={"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        )
+        assert old.status_code == 200
+    
+    def test_listing_cache_headers(self, client):
+        """Test política de cache y Surrogate-Key en listados"""
+        response = client.get("/api/products/category/smartphones")
+        assert "stale-while-revalidate" in response.headers["Cache-Control"]
+        keys = response.headers["Surrogate-Key"].split()
+        assert keys[0] == "products"
+        assert "category:smartphones" in keys
+        assert "product:MLA123456789" in keys
+    
     def test_get_product_not_found(self, client):
         """Test producto no encontrado"""
         response = client.get("/api/products/INVALID_ID")
@@ -59,6 +121,13 @@ class TestProducts:
         assert "page" in data
         assert isinstance(data["products"], list)
     
+    def test_products_list_includes_seller_and_category(self, client):
+        """Test el listado incluye vendedor y categoría"""
+        response = client.get("/api/products/", params={"limit": 5})
+        product = response.json()["products"][0]
+        assert product["seller"]["name"]
+        assert product["category"]["id"] == "smartphones"
+    
     def test_search_products_valid(self, client):
         """Test búsqueda de productos con query válido"""
         response = client.get("/api/products/search/Samsung")
@@ -109,6 +178,175 @@ class TestProducts:
         for product in data["products"]:
             assert 200 <= product["price"] <= 500
 
+    def test_products_sorted_with_filters(self, client):
+        """Test orden y filtros combinados en el listado"""
+        params = {"sort": "price_desc", "free_shipping": True, "min_rating": 4}
+        response = client.get("/api/products/", params=params)
+        assert response.status_code == 200
+        
+        prices = [p["price"] for p in response.json()["products"]]
+        assert prices == sorted(prices, reverse=True)
+        assert all(p["free_shipping"] for p in response.json()["products"])
+        
+        assert client.get("/api/products/", params={"sort": "random"}).status_code == 422
+
+    def test_products_range_filter(self, client):
+        """Test filtro por rango sobre atributos normalizados"""
+        response = client.get("/api/products/", params={"range": ["ram_gb:8:", "storage_gb:128:128"]})
+        assert response.status_code == 200
+        assert {p["id"] for p in response.json()["products"]} == {"MLA123456789", "MLA123456791"}
+        
+        assert client.get("/api/products/", params={"range": "ram:8:"}).status_code == 400
+        assert client.get("/api/products/", params={"range": "ram_gb:ocho:"}).status_code == 400
+
+    def test_products_total_and_pages(self, client):
+        """Test total y páginas cuentan todas las coincidencias"""
+        data = client.get("/api/products/", params={"limit": 1}).json()
+        assert data["size"] == 1
+        assert data["total"] == 4
+        assert data["pages"] == 4
+    
+    def test_search_with_typos(self, client):
+        """Test búsqueda con errores de tipeo y sugerencia"""
+        response = client.get("/api/products/", params={"search": "samsumg galxy a55"})
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["id"] for p in data["products"]] == ["MLA123456789"]
+        assert data["did_you_mean"] == "samsung galaxy a55"
+        
+        response = client.get("/api/products/search/samsumg galxy")
+        assert len(response.json()) > 0
+        assert response.headers["X-Did-You-Mean"] == "samsung%20galaxy"
+        assert "X-Did-You-Mean" not in client.get("/api/products/search/samsung").headers
+
+    def test_product_images_srcset(self, client):
+        """Test imágenes con derivados por tamaño"""
+        response = client.get("/api/products/MLA123456789/images", headers={"Accept": "image/webp"})
+        assert response.status_code == 200
+        assert response.headers["vary"] == "Accept, X-Site-Id"
+        
+        data = response.json()
+        assert data["total_images"] == 4
+        primary = data["primary_image"]
+        assert [s["size"] for s in primary["sizes"]] == ["thumbnail", "medium", "full"]
+        assert primary["srcset"].endswith("600w")
+        assert primary["width"] == 600
+        assert primary["immutable_url"] == f"{primary['url']}?v={primary['hash'][:12]}"
+    
+    def test_product_page(self, client):
+        """Test página de producto completa en un request"""
+        response = client.get("/api/products/MLA123456789/page")
+        assert response.status_code == 200
+        
+        page = response.json()
+        assert page["product"]["id"] == "MLA123456789"
+        assert "related_products" not in page["product"]
+        assert page["seller"]["id"] == "SELLER001"
+        assert len(page["related"]) > 0
+        assert page["images"]["total_images"] == len(page["product"]["images"])
+        assert [c["id"] for c in page["breadcrumb"]] == ["electronics", "smartphones"]
+        assert "product:MLA123456789" in response.headers["Surrogate-Key"]
+    
+    def test_product_page_selected_parts(self, client):
+        """Test solo se devuelven las partes pedidas"""
+        response = client.get(
+            "/api/products/MLA123456789/page",
+            params={"include": "seller,related", "related_limit": 2}
+        )
+        assert set(response.json()) == {"seller", "related"}
+        assert len(response.json()["related"]) == 2
+        
+        assert client.get("/api/products/MLA123456789/page", params={"include": "reviews"}).status_code == 400
+        assert client.get("/api/products/NOEXISTE/page").status_code == 404
+    
+    def test_product_images_not_found(self, client):
+        """Test imágenes de producto inexistente"""
+        response = client.get("/api/products/INVALID_ID/images")
+        assert response.status_code == 404
+
+class TestProductWrites:
+    """Test suite para endpoints de escritura"""
+    
+    def test_create_product(self, client, writable_service):
+        """Test crear producto"""
+        payload = {
+            "title": "Xiaomi Redmi Note 13",
+            "price": 250,
+            "category_id": "smartphones",
+            "seller_id": "SELLER003",
+            "stock": 5
+        }
+        response = client.post("/api/products/", json=payload)
+        assert response.status_code == 201
+        
+        data = response.json()
+        assert data["title"] == payload["title"]
+        assert data["seller"]["id"] == "SELLER003"
+        assert client.get(f"/api/products/{data['id']}").status_code == 200
+    
+    def test_create_product_invalid_price(self, client, writable_service):
+        """Test crear producto con precio inválido"""
+        payload = {"title": "X", "price": -1, "category_id": "smartphones", "seller_id": "SELLER001"}
+        response = client.post("/api/products/", json=payload)
+        assert response.status_code == 422
+    
+    def test_patch_and_delete_product(self, client, writable_service):
+        """Test actualizar y eliminar producto"""
+        response = client.patch("/api/products/MLA123456791", json={"stock": 0})
+        assert response.status_code == 200
+        assert response.json()["stock"] == 0
+        
+        assert client.delete("/api/products/MLA123456791").status_code == 204
+        assert client.get("/api/products/MLA123456791").status_code == 404
+        assert client.patch("/api/products/MLA123456791", json={"stock": 1}).status_code == 404
+
+    def test_related_update_invalidates_last_modified(self, client, writable_service):
+        """Test cambiar un relacionado invalida la copia condicional del detalle"""
+        last_modified = client.get("/api/products/MLA123456789").headers["Last-Modified"]
+        assert client.patch("/api/products/MLA123456790", json={"title": "Motorola renovado"}).status_code == 200
+        
+        response = client.get("/api/products/MLA123456789", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 200
+        assert response.json()["related_products"][0]["title"] == "Motorola renovado"
+
+    def test_bulk_update_stock(self, client, writable_service):
+        """Test actualización masiva de stock"""
+        payload = {"items": [
+            {"id": "MLA123456789", "stock": 3, "version": 1},
+            {"id": "MLA123456790", "stock": 3, "version": 9},
+        ]}
+        response = client.patch("/api/products/stock", json=payload)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["updated"] == 1
+        assert data["failed"] == 1
+        assert data["results"][1]["status"] == "conflict"
+        assert client.get("/api/products/MLA123456789").json()["version"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_detail_requests_are_coalesced(self, writable_service, monkeypatch):
+        """Test requests idénticos concurrentes comparten un solo cálculo"""
+        coalescer = RequestCoalescer()
+        monkeypatch.setattr("app.routers.products.request_coalescer", coalescer)
+        load = writable_service.get_product_by_id
+        
+        async def slow_get_product_by_id(product_id):
+            await asyncio.sleep(0.05)
+            return await load(product_id)
+        monkeypatch.setattr(writable_service, "get_product_by_id", slow_get_product_by_id)
+        
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            responses = await asyncio.gather(
+                *(async_client.get("/api/products/MLA123456789") for _ in range(5))
+            )
+        
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.content for r in responses}) == 1
+        assert responses[0].json()["id"] == "MLA123456789"
+        assert coalescer.stats()["routes"]["detail"] == {"executed": 1, "coalesced": 4}
+
 class TestErrorHandling:
     """Test suite para manejo de errores"""
     
@@ -140,6 +378,192 @@ class TestErrorHandling:
             assert error["type"] == "validation_error"
             assert "details" in error
 
+class TestProfiling:
+    """Test suite para el middleware de profiling"""
+    
+    @pytest.fixture
+    def profiled_client(self, monkeypatch):
+        monkeypatch.setattr("app.middleware.profiling.PROFILING_TOKEN", "secret")
+        profiled_app = FastAPI()
+        profiled_app.middleware("http")(profiling_middleware)
+        profiled_app.include_router(products.router)
+        profiled_app.include_router(debug.router)
+        with TestClient(profiled_app) as test_client:
+            yield test_client
+    
+    def test_requests_without_opt_in_are_not_profiled(self, profiled_client):
+        """Test sin header o con token inválido no se captura profile"""
+        response = profiled_client.get("/api/products/MLA123456789")
+        assert "X-Profile-ID" not in response.headers
+        
+        response = profiled_client.get(
+            "/api/products/MLA123456789",
+            headers={"X-Profile": "collapsed", "X-Profile-Token": "wrong"}
+        )
+        assert "X-Profile-ID" not in response.headers
+    
+    def test_collapsed_profile(self, profiled_client):
+        """Test profile collapsed descargable"""
+        headers = {"X-Profile": "collapsed", "X-Profile-Token": "secret"}
+        response = profiled_client.get("/api/products/MLA123456789", headers=headers)
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-ID"]
+        
+        profile = profiled_client.get(f"/debug/profiles/{profile_id}", headers=headers)
+        assert profile.status_code == 200
+        for line in profile.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+    
+    def test_pstats_profile(self, profiled_client):
+        """Test profile cProfile descargable"""
+        headers = {"X-Profile": "pstats", "X-Profile-Token": "secret"}
+        response = profiled_client.get("/api/products/", headers=headers)
+        profile_id = response.headers["X-Profile-ID"]
+        
+        profile = profiled_client.get(f"/debug/profiles/{profile_id}", headers=headers)
+        stats = marshal.loads(profile.content)
+        assert any(func[2] == "get_products" for func in stats)
+        
+        assert profiled_client.get(f"/debug/profiles/{profile_id}").status_code == 404
+
+class TestTracing:
+    """Test suite para el middleware de trazas"""
+    
+    def test_server_timing_breakdown(self, client):
+        """Test el header Server-Timing desglosa las etapas del request"""
+        response = client.get("/api/products/MLA123456789")
+        assert response.status_code == 200
+        timing = response.headers["Server-Timing"]
+        assert timing.startswith("total;dur=")
+        for stage in ("product.get_by_id", "serialize"):
+            assert f"{stage};dur=" in timing
+    
+    def test_search_timing_includes_query(self, client):
+        response = client.get("/api/products/search/Samsung")
+        assert "product.find;dur=" in response.headers["Server-Timing"]
+
+
+class TestTrafficControl:
+    """Test suite para control de admisión y rate limiting"""
+    
+    @pytest.fixture
+    def limited_client(self, monkeypatch):
+        monkeypatch.setattr("app.middleware.rate_limit.rate_limiters", {
+            "default": RateLimiter(rate=1, burst=3),
+            "search": RateLimiter(rate=1, burst=1),
+        })
+        limited_app = FastAPI()
+        limited_app.middleware("http")(rate_limit_middleware)
+        limited_app.include_router(products.router)
+        with TestClient(limited_app) as test_client:
+            yield test_client
+    
+    def test_search_has_tighter_budget(self, limited_client):
+        """Test la búsqueda agota su presupuesto antes que el detalle"""
+        assert limited_client.get("/api/products/search/samsung").status_code == 200
+        response = limited_client.get("/api/products/?search=samsung")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json()["error"]["type"] == "rate_limited"
+        
+        for _ in range(3):
+            assert limited_client.get("/api/products/MLA123456789").status_code == 200
+        assert limited_client.get("/api/products/MLA123456789").status_code == 429
+    
+    def test_api_key_has_its_own_bucket(self, limited_client):
+        """Test cada API key tiene su propio bucket"""
+        assert limited_client.get("/api/products/search/samsung").status_code == 200
+        response = limited_client.get("/api/products/search/samsung", headers={"X-API-Key": "partner"})
+        assert response.status_code == 200
+    
+    def test_idle_buckets_are_evicted(self):
+        """Test los clientes inactivos se descartan sin perder precisión"""
+        limiter = RateLimiter(rate=2, burst=4, sweep_interval=10)
+        for client in ("a", "b", "c"):
+            assert limiter.allow(client, now=0)[0]
+        assert len(limiter) == 3
+        
+        limiter.allow("d", now=10)
+        assert len(limiter) == 1
+    
+    @pytest.mark.asyncio
+    async def test_admission_sheds_when_queue_is_full(self):
+        """Test con la cola llena se rechaza sin esperar"""
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+        assert await controller.acquire()
+        
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+        assert await controller.acquire() is False
+        
+        assert await waiting is False
+        controller.release()
+        assert controller.stats()["rejected"] == 2
+        assert controller.stats()["in_flight"] == 0
+    
+    def test_overload_returns_503(self, monkeypatch):
+        """Test bajo sobrecarga se responde 503 con Retry-After"""
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+        monkeypatch.setattr("app.middleware.rate_limit.admission_controller", controller)
+        overloaded_app = FastAPI()
+        overloaded_app.middleware("http")(admission_middleware)
+        overloaded_app.include_router(products.router)
+        
+        with TestClient(overloaded_app) as test_client:
+            assert test_client.get("/api/products/MLA123456789").status_code == 200
+            test_client.portal.call(controller.acquire)
+            response = test_client.get("/api/products/MLA123456789")
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+class TestSites:
+    """Test suite para catálogos por sitio"""
+    
+    @pytest.fixture
+    def registry(self, data_path, monkeypatch):
+        # Sitio MLB: copia del catálogo con otro precio para distinguirlo
+        site_path = data_path / "sites" / "MLB"
+        shutil.copytree(data_path, site_path, ignore=shutil.ignore_patterns("sites"))
+        catalog = json.loads((site_path / "products.json").read_text(encoding="utf-8"))
+        catalog["products"][0]["price"] = 1999
+        (site_path / "products.json").write_text(json.dumps(catalog), encoding="utf-8")
+        
+        registry = SiteRegistry(base_path=str(data_path), max_sites=1)
+        monkeypatch.setattr("app.routers.products.site_registry", registry)
+        return registry
+    
+    def test_site_by_header_and_path(self, client, registry):
+        """Test el sitio se elige por header o por prefijo de ruta"""
+        default = client.get("/api/products/MLA123456789")
+        by_header = client.get("/api/products/MLA123456789", headers={"X-Site-Id": "MLB"})
+        by_path = client.get("/api/sites/MLB/products/MLA123456789")
+        
+        assert default.json()["price"] != 1999
+        assert by_header.json()["price"] == 1999
+        assert by_path.json()["price"] == 1999
+        assert "X-Site-Id" in default.headers["Vary"]
+        assert "MLB:product:MLA123456789" in by_path.headers["Surrogate-Key"].split()
+        assert registry.stats()["loaded"] == ["MLB"]
+    
+    def test_unknown_site(self, client, registry):
+        """Test un sitio inexistente responde 404"""
+        response = client.get("/api/sites/MCO/products/")
+        assert response.status_code == 404
+        assert "MCO" in response.json()["error"]["message"]
+    
+    def test_cold_sites_are_evicted(self, client, registry, data_path):
+        """Test el registro descarga el sitio menos usado"""
+        shutil.copytree(data_path / "sites" / "MLB", data_path / "sites" / "MLM")
+        assert client.get("/api/sites/MLB/products/").status_code == 200
+        assert client.get("/api/sites/MLM/products/").status_code == 200
+        
+        assert registry.stats()["loaded"] == ["MLM"]
+        assert registry.evictions == 1
+        assert registry.available() == ["MLA", "MLB", "MLM"]
+
 class TestStaticFiles:
     """Test suite para archivos estáticos"""
     
@@ -1,6 +1,29 @@
+import asyncio
+import json
+import random
+import threading
+
 import pytest
 
+from app.create_simple_images import IMAGES, render_svg_image, write_manifest
+from app.models.product import ProductCreate, ProductUpdate, StockUpdateItem
+from app.services.catalog_index import CatalogIndex
+from app.services.coalescer import RequestCoalescer
+from app.services.data_loader import DataLoader
+from app.services.fuzzy_index import TrigramIndex, edit_distance
+from app.services.normalization import (normalize_product, parse_measure,
+                                        parse_quantity)
+from app.services.catalog_snapshot import build_snapshot, load_snapshot
+from app.services.cache import (CacheEntry, InMemorySharedTier, LocalCache,
+                                TieredCache)
+from app.services.health_service import HealthMonitor
+from app.services.image_service import ImageService
 from app.services.product_service import ProductService
+from app.services.query_cache import QueryCache, QueryResult
+from app.services.task_executor import (ClientDisconnected, ExecutorBusy,
+                                        WorkerPool)
+from app.services.tracing import (OTLPJsonExporter, current_span, span,
+                                  start_trace, traced)
 
 
 class TestProductService:
@@ -47,4 +70,812 @@ class TestProductService:
         """Test búsqueda de productos"""
         products = await product_service.search_products("Samsung", limit=3)
         assert isinstance(products, list)
-        assert len(products) <= 3
\ No newline at end of file
+        assert len(products) <= 3
+
+
+class TestProductServiceWrites:
+    """Test suite para escrituras en ProductService"""
+    
+    @pytest.fixture
+    def new_product(self):
+        return ProductCreate(
+            title="Motorola Edge 50 Test",
+            price=350,
+            category_id="smartphones",
+            seller_id="SELLER002",
+            description="Equipo de prueba",
+            stock=10
+        )
+    
+    @pytest.mark.asyncio
+    async def test_create_product_updates_indexes(self, data_path, new_product):
+        """Test crear producto y encontrarlo por todos los índices"""
+        service = ProductService(data_path=str(data_path))
+        created = await service.create_product(new_product)
+        
+        assert created.id == "MLA123456793"
+        assert (await service.get_product_by_id(created.id)).title == new_product.title
+        
+        found = await service.get_products(search="motorola", category_id="smartphones",
+                                           min_price=300, max_price=400)
+        assert [p.id for p in found] == [created.id]
+    
+    @pytest.mark.asyncio
+    async def test_update_product_reindexes(self, data_path):
+        """Test actualización parcial reindexa precio y búsqueda"""
+        service = ProductService(data_path=str(data_path))
+        updated = await service.update_product("MLA123456792", ProductUpdate(price=999, title="Galaxy Renovado"))
+        
+        assert updated.price == 999
+        assert updated.stock > 0
+        assert [p.id for p in await service.search_products("renovado")] == ["MLA123456792"]
+        found = await service.get_products(min_price=900)
+        assert [p.id for p in found] == ["MLA123456792"]
+    
+    @pytest.mark.asyncio
+    async def test_delete_product(self, data_path):
+        """Test eliminar producto"""
+        service = ProductService(data_path=str(data_path))
+        assert await service.delete_product("MLA123456790") is True
+        assert await service.get_product_by_id("MLA123456790") is None
+        assert await service.delete_product("MLA123456790") is False
+        
+        related = (await service.get_product_by_id("MLA123456789")).related_products
+        assert "MLA123456790" not in [p.id for p in related]
+    
+    @pytest.mark.asyncio
+    async def test_create_product_invalid_category(self, data_path, new_product):
+        """Test crear producto con categoría inexistente"""
+        service = ProductService(data_path=str(data_path))
+        new_product.category_id = "INVALID"
+        with pytest.raises(ValueError):
+            await service.create_product(new_product)
+    
+    @pytest.mark.asyncio
+    async def test_writes_survive_restart_and_compaction(self, data_path, new_product):
+        """Test el log de escrituras se reaplica y compacta al JSON base"""
+        service = ProductService(data_path=str(data_path), compact_every=3)
+        created = await service.create_product(new_product)
+        await service.update_product(created.id, ProductUpdate(stock=3))
+        assert (data_path / "products.wal").exists()
+        
+        restarted = ProductService(data_path=str(data_path))
+        assert (await restarted.get_product_by_id(created.id)).stock == 3
+        
+        await service.delete_product("MLA123456789")
+        assert not (data_path / "products.wal").exists()
+        
+        restarted = ProductService(data_path=str(data_path))
+        assert await restarted.get_product_by_id("MLA123456789") is None
+        assert (await restarted.get_product_by_id(created.id)).stock == 3
+
+    
+    @pytest.mark.asyncio
+    async def test_bulk_update_stock_with_versions(self, data_path):
+        """Test actualización masiva con concurrencia optimista"""
+        service = ProductService(data_path=str(data_path))
+        results = await service.bulk_update_stock([
+            StockUpdateItem(id="MLA123456789", stock=7, version=1),
+            StockUpdateItem(id="MLA123456790", price=199, version=5),
+            StockUpdateItem(id="INVALID_ID", stock=1),
+            StockUpdateItem(id="MLA123456789", stock=8, version=2),
+        ])
+        
+        assert [r.status for r in results] == ["updated", "conflict", "not_found", "updated"]
+        product = await service.get_product_by_id("MLA123456789")
+        assert product.stock == 8
+        assert product.version == 3
+        assert (await service.get_product_by_id("MLA123456790")).price == 429
+    
+    @pytest.mark.asyncio
+    async def test_bulk_update_invalidates_only_affected_details(self, data_path, new_product):
+        """Test la invalidación del cache de detalle es selectiva"""
+        service = ProductService(data_path=str(data_path))
+        await service.create_product(new_product)
+        last = await service.create_product(new_product)
+        
+        first = await service.get_product_by_id("MLA123456789")
+        await service.get_product_by_id(last.id)
+        assert last.id not in [p.id for p in first.related_products]
+        
+        def cached(product_id):
+            return service._cache.get("detail:smartphones", product_id)
+        
+        await service.bulk_update_stock([StockUpdateItem(id=last.id, stock=1)])
+        assert await cached(last.id) is None
+        assert await cached("MLA123456789") is not None
+        
+        # Cambiar solo el stock no altera el resumen que ven los demás
+        await service.bulk_update_stock([StockUpdateItem(id="MLA123456792", stock=2)])
+        assert await cached("MLA123456789") is not None
+        
+        await service.bulk_update_stock([StockUpdateItem(id="MLA123456792", price=150)])
+        assert await cached("MLA123456789") is None
+        detail = await service.get_product_by_id("MLA123456789")
+        assert 150 in [p.price for p in detail.related_products]
+
+
+
+class TestImageService:
+    """Test suite para derivados de imágenes"""
+    
+    @pytest.fixture
+    def static_dir(self, tmp_path):
+        Image = pytest.importorskip("PIL.Image")
+        products_dir = tmp_path / "images" / "products"
+        products_dir.mkdir(parents=True)
+        Image.new("RGB", (600, 600), "#667eea").save(products_dir / "photo.png")
+        return tmp_path
+    
+    def test_srcset_generates_content_addressed_derivatives(self, static_dir):
+        """Test derivados por tamaño con nombre direccionado por contenido"""
+        service = ImageService(static_dir=str(static_dir))
+        url = "http://localhost:8000/static/images/products/photo.png"
+        
+        assert service.thumbnail_url(url) == url  # todavía no generado
+        
+        sizes = service.srcset(url, "webp")
+        assert [s["size"] for s in sizes] == ["thumbnail", "medium", "full"]
+        assert all(s["url"].startswith("http://localhost:8000/static/images/cache/") for s in sizes)
+        assert all(s["url"].endswith(".webp") for s in sizes)
+        assert service.srcset(url, "webp") == sizes
+        
+        service.srcset(url, "png")
+        assert service.thumbnail_url(url).endswith("-150.png")
+    
+    def test_unrenderable_source_falls_back_to_original(self, static_dir):
+        """Test imagen inexistente devuelve la URL original"""
+        service = ImageService(static_dir=str(static_dir))
+        url = "http://localhost:8000/static/images/products/missing.svg"
+        assert {s["url"] for s in service.srcset(url)} == {url}
+    
+    def test_manifest_metadata_and_immutable_url(self, tmp_path):
+        """Test metadatos e URL versionada salen del manifest"""
+        entry = render_svg_image(IMAGES[0], str(tmp_path))
+        write_manifest([entry], tmp_path / "manifest.json")
+        
+        service = ImageService(static_dir=str(tmp_path), manifest_path=str(tmp_path / "manifest.json"))
+        url = f"http://localhost:8000/static/images/products/{entry['filename']}"
+        
+        info = service.asset_info(url)
+        assert info["hash"] == entry["hash"]
+        assert info["width"] == 600
+        assert service.immutable_url(url) == f"{url}?v={entry['hash'][:12]}"
+    
+    def test_negotiate_format(self):
+        """Test negociación de formato por header Accept"""
+        pytest.importorskip("PIL.Image")
+        assert ImageService.negotiate_format("image/avif,image/webp,*/*") == "webp"
+        assert ImageService.negotiate_format(None) == "png"
+
+
+
+class TestAssetBuild:
+    """Test suite para el build de imágenes SVG"""
+    
+    def test_render_skips_unchanged_outputs(self, tmp_path):
+        """Test el render no reescribe archivos con el mismo hash"""
+        first = render_svg_image(IMAGES[0], str(tmp_path))
+        assert first["status"] == "created"
+        assert (tmp_path / first["filename"]).stat().st_size == first["size"]
+        
+        second = render_svg_image(IMAGES[0], str(tmp_path), previous_hash=first["hash"])
+        assert second["status"] == "unchanged"
+        assert second["hash"] == first["hash"]
+    
+    def test_manifest_only_rewritten_on_changes(self, tmp_path):
+        """Test el manifest no se reescribe si los assets no cambian"""
+        entries = [render_svg_image(spec, str(tmp_path)) for spec in IMAGES[:2]]
+        manifest_file = tmp_path / "manifest.json"
+        
+        assert write_manifest(entries, manifest_file) is True
+        assert write_manifest(entries, manifest_file) is False
+
+
+
+class TestCatalogSnapshot:
+    """Test suite para el snapshot precompilado del catálogo"""
+    
+    @pytest.mark.asyncio
+    async def test_service_loads_from_snapshot(self, data_path):
+        """Test con snapshot vigente no se parsean los JSON"""
+        build_snapshot(str(data_path))
+        service = ProductService(data_path=str(data_path))
+        
+        async def not_expected(filename):
+            raise AssertionError(f"No debería leer {filename}")
+        service._load_json_file = not_expected
+        
+        product = await service.get_product_by_id("MLA123456789")
+        assert product is not None
+        assert product.seller.id == "SELLER001"
+        assert len(await service._get_categories_data()) > 0
+    
+    def test_stale_snapshot_is_ignored(self, data_path):
+        """Test un cambio en los JSON invalida el snapshot"""
+        build_snapshot(str(data_path))
+        assert load_snapshot(data_path) is not None
+        
+        products_file = data_path / "products.json"
+        products_file.write_text(products_file.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+        assert load_snapshot(data_path) is None
+    
+    @pytest.mark.asyncio
+    async def test_compaction_regenerates_snapshot(self, data_path):
+        """Test la compactación del log deja el snapshot al día"""
+        build_snapshot(str(data_path))
+        service = ProductService(data_path=str(data_path))
+        await service.update_product("MLA123456789", ProductUpdate(stock=7))
+        await service.compact()
+        
+        snapshot = load_snapshot(data_path)
+        assert snapshot is not None
+        assert snapshot["catalog"].get("MLA123456789")["stock"] == 7
+
+
+
+class TestRequestCoalescer:
+    """Test suite para deduplicación de requests concurrentes"""
+    
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_execution(self):
+        """Test llamadas idénticas concurrentes ejecutan el loader una vez"""
+        coalescer = RequestCoalescer()
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return b"[]"
+        
+        results = await asyncio.gather(
+            *(coalescer.run("search", ("samsung", 10), loader) for _ in range(5)),
+            coalescer.run("search", ("apple", 10), loader)
+        )
+        assert results == [b"[]"] * 6
+        assert len(calls) == 2
+        assert coalescer.stats()["routes"]["search"] == {"executed": 2, "coalesced": 4}
+        assert coalescer.stats()["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_and_not_cached(self):
+        """Test el error llega a todos y el siguiente request reintenta"""
+        coalescer = RequestCoalescer()
+        
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise LookupError("no encontrado")
+        
+        results = await asyncio.gather(
+            *(coalescer.run("detail", "X", failing) for _ in range(3)),
+            return_exceptions=True
+        )
+        assert all(isinstance(r, LookupError) for r in results)
+        
+        async def ok():
+            return b"{}"
+        assert await coalescer.run("detail", "X", ok) == b"{}"
+    
+    @pytest.mark.asyncio
+    async def test_first_caller_cancellation_does_not_affect_others(self):
+        """Test si el primer cliente se va, los demás reciben el resultado"""
+        coalescer = RequestCoalescer()
+        
+        async def loader():
+            await asyncio.sleep(0.02)
+            return b"ok"
+        
+        first = asyncio.ensure_future(coalescer.run("detail", "A", loader))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(coalescer.run("detail", "A", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == b"ok"
+
+
+
+class TestNormalization:
+    """Test suite para la normalización de atributos"""
+    
+    def test_parse_quantity(self):
+        assert parse_quantity("500+") == 500
+        assert parse_quantity("1.000+") == 1000
+        assert parse_quantity("5k+") == 5000
+        assert parse_quantity(42) == 42
+        assert parse_quantity("muchas") is None
+    
+    def test_parse_measure_to_canonical_units(self):
+        assert parse_measure("8 GB") == (8.0, "GB")
+        assert parse_measure("1 TB") == (1024.0, "GB")
+        assert parse_measure('6.6"') == (6.6, "in")
+        assert parse_measure("50 Mpx") == (50.0, "Mpx")
+        assert parse_measure("Super AMOLED") is None
+        assert parse_measure("12 núcleos") is None
+    
+    def test_normalize_product(self):
+        product = {
+            "sold_quantity": "500+",
+            "specifications": [
+                {"label": "Memoria RAM", "value": "8 GB"},
+                {"label": "Almacenamiento interno", "value": "512 MB"},
+                {"label": "Tamaño de pantalla", "value": "8 GB"},
+                {"label": "Sistema operativo", "value": "Android"},
+            ]
+        }
+        assert normalize_product(product) == {"sold_quantity": 500, "ram_gb": 8.0, "storage_gb": 0.5}
+    
+    @pytest.mark.asyncio
+    async def test_range_filters_and_sort(self, data_path):
+        """Test filtros por rango y orden sobre atributos normalizados"""
+        service = ProductService(data_path=str(data_path))
+        products = await service.get_products(ranges={"ram_gb": (8, None)}, sort="sold_desc")
+        assert [p.id for p in products] == ["MLA123456789", "MLA123456791"]
+        
+        catalog = await service._get_catalog()
+        catalog.upsert({**catalog.get("MLA123456791"), "sold_quantity": "900+"})
+        products = await service.get_products(ranges={"ram_gb": (8, None)}, sort="sold_desc")
+        assert [p.id for p in products] == ["MLA123456791", "MLA123456789"]
+        
+        product = await service.get_product_by_id("MLA123456789")
+        assert product.seller.sales_count == 1000
+
+
+
+class TestFuzzySearch:
+    """Test suite para la búsqueda tolerante a errores"""
+    
+    def test_edit_distance(self):
+        assert edit_distance("samsumg", "samsung", 2) == 1
+        assert edit_distance("galxay", "galaxy", 1) == 1
+        assert edit_distance("galxy", "galaxy", 1) == 1
+        assert edit_distance("motorola", "samsung", 2) is None
+        assert edit_distance("a55", "a5", 0) is None
+    
+    def test_only_candidate_terms_are_verified(self, monkeypatch):
+        """Test solo se calcula la distancia contra términos con trigramas en común"""
+        index = TrigramIndex()
+        index.add("P1", ["samsung", "galaxy"])
+        index.add("P2", [f"modelo{i}" for i in range(500)])
+        
+        compared = []
+        def counting_edit_distance(a, b, limit):
+            compared.append(b)
+            return edit_distance(a, b, limit)
+        monkeypatch.setattr("app.services.fuzzy_index.edit_distance", counting_edit_distance)
+        
+        assert index.similar("samsumg") == [("samsung", 1)]
+        assert compared == ["samsung"]
+    
+    def test_catalog_fuzzy_query_and_suggestion(self):
+        """Test consulta con errores de tipeo y sugerencia sobre el índice"""
+        catalog = CatalogIndex([
+            {"id": "P1", "title": "Samsung Galaxy A55", "description": "", "price": 400, "category_id": "smartphones"},
+            {"id": "P2", "title": "Motorola Edge 40", "description": "", "price": 300, "category_id": "smartphones",
+             "specifications": [{"label": "Marca", "value": "Lenovo"}]},
+        ])
+        
+        assert catalog.query(search="samsumg galxy") == []
+        assert catalog.query(search="samsumg galxy", fuzzy=True) == ["P1"]
+        assert catalog.query(search="lenvo", fuzzy=True) == ["P2"]
+        assert catalog.suggest("samsumg galxy a55") == "samsung galaxy a55"
+        assert catalog.suggest("samsung galaxy") is None
+        
+        catalog.upsert({"id": "P2", "title": "Motorola Razr", "description": "", "price": 300, "category_id": "smartphones"})
+        assert "edge" not in catalog.terms and "lenovo" not in catalog.terms
+        catalog.remove("P1")
+        assert catalog.query(search="samsumg", fuzzy=True) == []
+        assert catalog.suggest("samsumg") is None
+    
+    @pytest.mark.asyncio
+    async def test_find_products_falls_back_to_fuzzy(self):
+        """Test sin coincidencias exactas se busca tolerando errores"""
+        service = ProductService()
+        products, total, suggestion = await service.find_products(search="samsumg galxy a55")
+        
+        assert [p.id for p in products] == ["MLA123456789"]
+        assert total == 1
+        assert suggestion == "samsung galaxy a55"
+        
+        _, _, suggestion = await service.find_products(search="galaxy a55")
+        assert suggestion is None
+
+
+class TestQueryCache:
+    """Test suite para el cache de resultados de listados"""
+    
+    def test_lru_bounded_by_bytes_and_version(self):
+        result = QueryResult(("MLA1", "MLA2"), 2)
+        cache = QueryCache(max_bytes=result.size() * 2)
+        cache.set("a", 1, result)
+        cache.set("b", 1, result)
+        assert cache.get("a", 1) == result
+        
+        cache.set("c", 1, result)
+        assert cache.get("b", 1) is None
+        assert cache.evictions == 1
+        
+        # Una versión nueva del catálogo descarta todo
+        assert cache.get("a", 2) is None
+        assert len(cache) == 0
+        assert cache.invalidations == 1
+    
+    def test_per_key_stats(self):
+        cache = QueryCache(tracked_keys=2)
+        cache.get("popular", 1)
+        cache.set("popular", 1, QueryResult(("MLA1",), 1))
+        for _ in range(3):
+            cache.get("popular", 1)
+        cache.get("rara", 1)
+        cache.get("otra", 1)
+        
+        stats = cache.stats()
+        assert stats["hits"] == 3 and stats["misses"] == 3
+        # Solo se siguen las `tracked_keys` claves usadas más recientemente
+        assert [entry["key"] for entry in stats["top_keys"]] == ["'rara'", "'otra'"]
+        
+        cache.get("popular", 1)
+        top = cache.stats()["top_keys"][0]
+        assert top["key"] == "'popular'" and top["hits"] == 1 and top["cached"]
+    
+    @pytest.mark.asyncio
+    async def test_find_products_uses_cache_until_write(self, data_path):
+        """Test el listado se memoriza y una escritura lo invalida"""
+        service = ProductService(data_path=str(data_path))
+        products, total, _ = await service.find_products(limit=2, sort="price_asc")
+        assert total == 4
+        
+        cached, _, _ = await service.find_products(limit=2, sort="price_asc")
+        assert [p.id for p in cached] == [p.id for p in products]
+        assert service._query_cache.hits == 1
+        
+        await service.update_product(products[1].id, ProductUpdate(price=1))
+        refreshed, _, _ = await service.find_products(limit=2, sort="price_asc")
+        assert refreshed[0].id == products[1].id
+        assert service._query_cache.hits == 1
+
+
+class TestTaskExecutor:
+    """Test suite para los pools de trabajo fuera del event loop"""
+    
+    @pytest.fixture
+    def busy_pool(self):
+        """Pool de un thread ocupado hasta que se libere el evento"""
+        pool = WorkerPool("test", "thread", max_workers=1, max_queue=1)
+        release = threading.Event()
+        yield pool, release
+        release.set()
+        pool.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_queue_limit_rejects(self, busy_pool):
+        pool, release = busy_pool
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(lambda: "listo"))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(ExecutorBusy):
+            await pool.run(lambda: "rechazado")
+        
+        release.set()
+        assert await queued == "listo"
+        assert await running is True
+        await asyncio.sleep(0)
+        stats = pool.stats()
+        assert stats["completed"] == 2 and stats["rejected"] == 1 and stats["pending"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_queued_work(self, busy_pool):
+        """Test un trabajo en cola se descarta si el cliente se desconecta"""
+        pool, release = busy_pool
+        
+        class DisconnectedRequest:
+            async def is_disconnected(self):
+                return True
+        
+        ran = []
+        running = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(ClientDisconnected):
+            await pool.run(ran.append, "no", request=DisconnectedRequest())
+        
+        release.set()
+        await running
+        assert ran == []
+        assert pool.stats()["cancelled"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_process_pool(self):
+        pool = WorkerPool("cpu", "process", max_workers=1, max_queue=1)
+        try:
+            assert await pool.run(sum, [1, 2, 3]) == 6
+        finally:
+            pool.shutdown()
+        assert pool.stats()["avg_run_ms"] is not None
+
+
+class TestTracing:
+    """Test suite para las trazas por request"""
+    
+    @pytest.mark.asyncio
+    async def test_spans_nest_across_tasks(self):
+        """Test los spans de tareas concurrentes cuelgan del span que las lanzó"""
+        @traced("child")
+        async def child():
+            await asyncio.sleep(0)
+            return current_span()
+        
+        with start_trace("request") as root:
+            with span("fan_out") as fan_out:
+                first, second = await asyncio.gather(child(), child())
+        
+        assert first is not second
+        assert first.parent_id == second.parent_id == fan_out.span_id
+        assert fan_out.parent_id == root.span_id
+        assert [s.name for s in root.trace.spans] == ["child", "child", "fan_out", "request"]
+        assert current_span() is None
+    
+    def test_span_outside_trace_is_noop(self):
+        with span("sin_request") as measured:
+            assert measured is None
+    
+    def test_traceparent_continues_remote_trace(self):
+        trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+        with start_trace("request", f"00-{trace_id}-{parent_id}-01") as root:
+            pass
+        assert root.trace.trace_id == trace_id and root.parent_id == parent_id
+        
+        with start_trace("request", "basura") as root:
+            pass
+        assert len(root.trace.trace_id) == 32 and root.parent_id is None
+    
+    def test_server_timing_sums_stages(self):
+        with start_trace("request") as root:
+            for _ in range(2):
+                with span("db"):
+                    pass
+        header = root.trace.server_timing(root)
+        assert header.startswith("total;dur=")
+        assert header.count("db;dur=") == 1
+    
+    def test_otlp_export_to_file(self, tmp_path):
+        """Test el exportador escribe una línea OTLP/JSON por traza"""
+        path = tmp_path / "traces.jsonl"
+        exporter = OTLPJsonExporter(lambda: open(path, "a", encoding="utf-8"))
+        with start_trace("request", **{"http.method": "GET"}) as root:
+            with pytest.raises(ValueError):
+                with span("falla"):
+                    raise ValueError("boom")
+        exporter.export(root.trace)
+        exporter.flush()
+        
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        failed, request = spans
+        assert failed["parentSpanId"] == request["spanId"]
+        assert failed["traceId"] == request["traceId"] == root.trace.trace_id
+        assert failed["status"] == {"code": 2, "message": "boom"}
+        assert request["attributes"] == [{"key": "http.method", "value": {"stringValue": "GET"}}]
+        assert int(request["endTimeUnixNano"]) >= int(request["startTimeUnixNano"])
+        assert exporter.stats()["exported"] == 1
+
+
+class TestVectorizedQueries:
+    """Test suite para el motor de filtros vectorizado"""
+    
+    @staticmethod
+    def synthetic_products(count):
+        rng = random.Random(7)
+        return [{
+            "id": f"MLA{i}",
+            "title": f"Producto {rng.choice(['samsung', 'motorola', 'apple'])} {i}",
+            "description": "",
+            "price": float(rng.randint(50, 1500)),
+            "rating": rng.choice([3.5, 4.0, 4.5, 5.0]),
+            "reviews_count": rng.randint(0, 500),
+            "stock": rng.randint(0, 30),
+            "free_shipping": rng.random() < 0.5,
+            "condition": rng.choice(["Nuevo", "Usado"]),
+            "category_id": rng.choice(["smartphones", "tablets", "audio"]),
+            "sold_quantity": f"{rng.randint(0, 9) * 100}+",
+            "specifications": [
+                {"label": "Memoria RAM", "value": f"{rng.choice([4, 6, 8, 12])} GB"},
+                {"label": "Tamaño de pantalla", "value": f'{rng.choice([6.1, 6.6, 6.7])}"'},
+            ] if rng.random() < 0.7 else [],
+        } for i in range(count)]
+    
+    def test_matches_python_engine(self):
+        """Test el resultado vectorizado coincide con el camino en Python"""
+        pytest.importorskip("numpy")
+        products = self.synthetic_products(2000)
+        vectorized = CatalogIndex(products, vectorized=True)
+        plain = CatalogIndex(products, vectorized=False)
+        
+        for product_id in ("MLA3", "MLA500", "MLA1999"):
+            vectorized.remove(product_id)
+            plain.remove(product_id)
+        
+        queries = [
+            {},
+            {"category_id": "tablets", "min_price": 300, "max_price": 900},
+            {"free_shipping": True, "condition": "Usado", "min_rating": 4.5, "sort": "price_asc"},
+            {"search": "samsung", "sort": "rating_desc", "skip": 20, "limit": 15},
+            {"category_id": "audio", "sort": "reviews_desc", "limit": 100},
+            {"sort": "price_desc", "skip": 1990, "limit": 50},
+            {"condition": "Reacondicionado"},
+            {"ranges": {"ram_gb": (8, None), "screen_in": (6.5, 6.7)}, "sort": "sold_desc"},
+            {"ranges": {"sold_quantity": (None, 300)}, "sort": "ram_desc", "skip": 100, "limit": 30},
+            {"sort": "screen_desc", "skip": 1300, "limit": 100},
+        ]
+        for query in queries:
+            assert vectorized.query_page(**query) == plain.query_page(**query), query
+    
+    def test_updates_and_compaction_keep_catalog_order(self):
+        """Test las escrituras mantienen las columnas y el orden de catálogo"""
+        pytest.importorskip("numpy")
+        products = self.synthetic_products(3000)
+        catalog = CatalogIndex(products, vectorized=True)
+        
+        for product in products[:2000]:
+            catalog.remove(product["id"])
+        assert len(catalog.columns) == 1000
+        assert catalog.columns.size < 3000  # se compactaron filas muertas
+        
+        catalog.upsert({**products[2500], "price": 1.0})
+        ids, total = catalog.query_page(sort="price_asc", limit=1)
+        assert ids == ["MLA2500"]
+        
+        ids, total = catalog.query_page(limit=1000)
+        assert ids == [p["id"] for p in products[2000:]]
+        assert total == 1000
+
+
+
+class TestDataLoader:
+    """Test suite para el batching de enriquecimiento"""
+    
+    @pytest.mark.asyncio
+    async def test_loads_in_same_tick_are_batched(self):
+        """Test cargas de coroutines independientes van en un solo lote"""
+        batches = []
+        
+        async def batch_fn(keys):
+            batches.append(list(keys))
+            return {key: key.upper() for key in keys if key != "missing"}
+        
+        loader = DataLoader(batch_fn)
+        
+        async def resolve(key):
+            return await loader.load(key)
+        
+        results = await asyncio.gather(*(resolve(k) for k in ["a", "b", "a", "missing"]))
+        assert results == ["A", "B", "A", None]
+        assert batches == [["a", "b", "missing"]]
+        
+        assert await loader.load("b") == "B"
+        assert await loader.load_many(["c", "a"]) == ["C", "A"]
+        assert batches == [["a", "b", "missing"], ["c"]]
+    
+    @pytest.mark.asyncio
+    async def test_errors_are_not_memoized(self):
+        """Test un lote fallido se reintenta en el siguiente load"""
+        calls = []
+        
+        async def batch_fn(keys):
+            calls.append(keys)
+            if len(calls) == 1:
+                raise ConnectionError("servicio de vendedores caído")
+            return {key: key for key in keys}
+        
+        loader = DataLoader(batch_fn)
+        with pytest.raises(ConnectionError):
+            await loader.load("x")
+        assert await loader.load("x") == "x"
+    
+    @pytest.mark.asyncio
+    async def test_listing_and_detail_enrichment_is_batched(self, data_path):
+        """Test una página y un detalle resuelven vendedores en un solo lote"""
+        service = ProductService(data_path=str(data_path))
+        seller_batches = []
+        load_sellers = service._load_sellers
+        
+        async def counting_load_sellers(seller_ids):
+            seller_batches.append(seller_ids)
+            return await load_sellers(seller_ids)
+        service._load_sellers = counting_load_sellers
+        
+        products = await service.get_products(limit=10)
+        assert len(seller_batches) == 1
+        assert all(p.seller is not None and p.category is not None for p in products)
+        assert products[0].category.name == "Smartphones"
+        
+        detail = await service.get_product_by_id("MLA123456789")
+        assert len(seller_batches) == 2
+        assert detail.seller.id == "SELLER001"
+        assert all(p.seller is not None for p in detail.related_products)
+
+
+
+class TestHealthMonitor:
+    """Test suite para chequeos de salud en segundo plano"""
+    
+    @pytest.mark.asyncio
+    async def test_snapshot_reflects_catalog_state(self, tmp_path):
+        """Test el estado del catálogo es en vivo y el resto se cachea"""
+        service = ProductService()
+        monitor = HealthMonitor(service=service, static_dir=str(tmp_path))
+        
+        first = await monitor.snapshot()
+        assert first["catalog"] == {"loaded": False}
+        assert first["images_available"] == 0
+        
+        await service.warm_up()
+        second = await monitor.snapshot()
+        assert second["catalog"]["loaded"] is True
+        assert second["checked_at"] == first["checked_at"]
+
+
+
+class TestTieredCache:
+    """Test suite para el cache de dos niveles"""
+    
+    def test_local_cache_evicts_by_size(self):
+        """Test LRU acotado por bytes"""
+        cache = LocalCache(max_bytes=100)
+        for key in ["a", "b", "c"]:
+            cache.set(key, CacheEntry(key, 0, 1e12, 0, 40))
+        
+        assert "a" not in cache
+        assert cache.current_bytes == 80
+        assert cache.get("b") is not None
+        cache.set("d", CacheEntry("d", 0, 1e12, 0, 40))
+        assert "c" not in cache and "b" in cache
+    
+    @pytest.mark.asyncio
+    async def test_shared_tier_warms_other_workers(self):
+        """Test un worker reutiliza la entrada calculada por otro"""
+        shared = InMemorySharedTier()
+        worker_a = TieredCache(shared=shared, version_ttl=0)
+        worker_b = TieredCache(shared=shared, version_ttl=0)
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            return {"value": 1}
+        
+        assert await worker_a.get_or_load("ns", "k", loader) == {"value": 1}
+        assert await worker_b.get_or_load("ns", "k", loader) == {"value": 1}
+        assert len(calls) == 1
+        
+        await worker_b.bump("ns")
+        assert await worker_a.get("ns", "k") is None
+    
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self):
+        """Test se sirve la entrada vencida y se refresca en segundo plano"""
+        cache = TieredCache()
+        values = iter([1, 2])
+        
+        async def loader():
+            return next(values)
+        
+        assert await cache.get_or_load("ns", "k", loader, ttl=0, stale_ttl=60) == 1
+        assert await cache.get_or_load("ns", "k", loader, ttl=0, stale_ttl=60) == 1
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get("ns", "k") == 2
+    
+    @pytest.mark.asyncio
+    async def test_product_details_shared_between_services(self, data_path):
+        """Test dos servicios comparten el detalle por el nivel compartido"""
+        shared = InMemorySharedTier()
+        first = ProductService(data_path=str(data_path), cache=TieredCache(shared=shared, version_ttl=0))
+        second = ProductService(data_path=str(data_path), cache=TieredCache(shared=shared, version_ttl=0))
+        
+        async def not_expected(product_id):
+            raise AssertionError("el detalle debía salir del nivel compartido")
+        
+        detail = await first.get_product_by_id("MLA123456789")
+        second._build_product_detail = not_expected
+        assert (await second.get_product_by_id("MLA123456789")).id == detail.id
@@ -0,0 +1,73 @@
+"""
+Benchmark de filtros combinados + orden + top-k sobre un catálogo sintético.
+
+Compara una comprensión de listas por predicado + `sorted` (el camino en
+Python) con las máscaras de `ColumnarIndex` + `argpartition` (requiere numpy).
+
+Uso (desde la raíz del backend):
+    python -m benchmarks.filters [cantidad_de_productos]
+"""
+import random
+import sys
+import time
+import timeit
+
+from app.services.columnar_index import ColumnarIndex, vectorized_available
+
+REPEAT = 5
+
+
+def synthetic_products(count: int):
+    rng = random.Random(42)
+    categories = ["smartphones", "tablets", "audio", "notebooks", "tv"]
+    return [{
+        "id": f"MLA{i}",
+        "price": float(rng.randint(50, 3000)),
+        "rating": rng.choice([3.0, 3.5, 4.0, 4.5, 5.0]),
+        "reviews_count": rng.randint(0, 5000),
+        "stock": rng.randint(0, 100),
+        "free_shipping": rng.random() < 0.5,
+        "condition": rng.choice(["Nuevo", "Usado", "Reacondicionado"]),
+        "category_id": rng.choice(categories),
+    } for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    products = synthetic_products(count)
+    query = {"category_id": "smartphones", "min_price": 200, "max_price": 1500,
+             "free_shipping": True, "min_rating": 4.0}
+
+    def python_filters():
+        result = [p for p in products if p["category_id"] == query["category_id"]]
+        result = [p for p in result if p["price"] >= query["min_price"]]
+        result = [p for p in result if p["price"] <= query["max_price"]]
+        result = [p for p in result if p["free_shipping"] == query["free_shipping"]]
+        result = [p for p in result if p["rating"] >= query["min_rating"]]
+        return [p["id"] for p in sorted(result, key=lambda p: p["price"])[:20]]
+
+    print(f"{count} productos, filtros {query}, sort=price_asc, top 20")
+    per_call = min(timeit.repeat(python_filters, number=1, repeat=REPEAT))
+    print(f"  {'Python (listas + sorted)':<32} {per_call * 1e3:8.1f} ms")
+
+    if not vectorized_available():
+        print("  numpy no instalado: se omite ColumnarIndex")
+        return
+
+    start = time.perf_counter()
+    columns = ColumnarIndex(capacity=count)
+    for product in products:
+        columns.upsert(product)
+    print(f"  (carga de columnas: {time.perf_counter() - start:.2f} s)")
+
+    def vectorized():
+        return columns.select(columns.mask(**query), sort="price_asc", limit=20)[0]
+
+    assert vectorized() == python_filters()
+    vec_per_call = min(timeit.repeat(vectorized, number=1, repeat=REPEAT))
+    print(f"  {'ColumnarIndex (máscaras + top-k)':<32} {vec_per_call * 1e3:8.1f} ms  "
+          f"({per_call / vec_per_call:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
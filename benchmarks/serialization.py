@@ -0,0 +1,54 @@
+"""
+Benchmark de serialización de la respuesta de detalle de producto.
+
+Compara el camino por defecto de FastAPI (validación del response_model,
+`jsonable_encoder`/dump a dicts y `json.dumps`) con `FastJSONResponse`.
+
+Uso (desde la raíz del backend):
+    python -m benchmarks.serialization
+"""
+import asyncio
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models.product import ProductResponse
+from app.responses import FastJSONResponse
+from app.services.product_service import ProductService
+
+ITERATIONS = 2000
+
+
+def main():
+    product = asyncio.run(ProductService().get_product_by_id("MLA123456789"))
+    adapter = TypeAdapter(ProductResponse)
+
+    def fastapi_response_model():
+        # Lo que hace FastAPI con response_model: revalidar y volcar a dicts
+        value = adapter.validate_python(product)
+        return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+    def fastapi_jsonable_encoder():
+        return JSONResponse(jsonable_encoder(product)).body
+
+    def fast_json_response():
+        return FastJSONResponse(product).body
+
+    assert len(fast_json_response()) > 0
+
+    print(f"Detalle de producto ({len(fast_json_response())} bytes), {ITERATIONS} iteraciones")
+    baseline = None
+    for name, func in [
+        ("FastAPI response_model + json.dumps", fastapi_response_model),
+        ("jsonable_encoder + json.dumps", fastapi_jsonable_encoder),
+        ("FastJSONResponse (model_dump_json)", fast_json_response),
+    ]:
+        per_call = min(timeit.repeat(func, number=ITERATIONS, repeat=5)) / ITERATIONS
+        baseline = baseline or per_call
+        print(f"  {name:<40} {per_call * 1e6:8.1f} µs  ({baseline / per_call:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()